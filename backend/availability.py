@@ -0,0 +1,227 @@
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+# Vehicle needs 1.5 hours (90 minutes) after every booking before the next one
+BUFFER_MINUTES = 90
+
+# Booking statuses that hold the vehicle
+BLOCKING_STATUSES = ("paid", "pending")
+
+# Vehicle of bookings made before the fleet existed
+DEFAULT_VEHICLE_ID = "default"
+
+
+# Utility function to parse time string to minutes
+def time_to_minutes(time_str: str) -> int:
+    """Convert time string like '09:00 AM' to minutes since midnight"""
+    time_part, period = time_str.rsplit(' ', 1)
+    hours, minutes = map(int, time_part.split(':'))
+
+    if period == 'PM' and hours != 12:
+        hours += 12
+    elif period == 'AM' and hours == 12:
+        hours = 0
+
+    return hours * 60 + minutes
+
+def minutes_to_time(minutes: int) -> str:
+    """Convert minutes since midnight to time string like '09:00 AM'"""
+    hours = minutes // 60
+    mins = minutes % 60
+    period = 'AM' if hours < 12 else 'PM'
+
+    if hours == 0:
+        hours = 12
+    elif hours > 12:
+        hours -= 12
+
+    return f"{hours:02d}:{mins:02d} {period}"
+
+
+class BlockedInterval(NamedTuple):
+    start: int
+    blocked_until: int
+    booking_id: str
+    # Pending bookings only block until their hold runs out
+    hold_expires_at: Optional[datetime] = None
+
+
+def booking_minutes(start_time: str, end_time: str) -> Dict[str, int]:
+    """Integer minute fields stored alongside the 12-hour time strings"""
+    start = time_to_minutes(start_time)
+    end = time_to_minutes(end_time)
+    return {
+        "start_minutes": start,
+        "end_minutes": end,
+        "blocked_until_minutes": end + BUFFER_MINUTES,
+    }
+
+
+def blocked_interval(booking: dict) -> BlockedInterval:
+    """Interval a booking holds the vehicle for, buffer included"""
+    hold_expires_at = None
+    if booking.get('payment_status') == 'pending':
+        hold_expires_at = booking.get('hold_expires_at')
+    if 'blocked_until_minutes' in booking:
+        return BlockedInterval(
+            booking['start_minutes'], booking['blocked_until_minutes'], booking['id'],
+            hold_expires_at
+        )
+    # Documents written before the minute fields were backfilled
+    start = time_to_minutes(booking['start_time'])
+    end = time_to_minutes(booking['end_time'])
+    return BlockedInterval(start, end + BUFFER_MINUTES, booking['id'], hold_expires_at)
+
+
+class DayIntervals:
+    """Blocked intervals of a single date, sorted by start.
+
+    ``_prefix_max[i]`` points at the interval with the latest ``blocked_until``
+    among the first ``i + 1`` intervals, so an overlap query is one bisect plus
+    one lookup. Inserts and removals are O(n) list shifts. Holds that ran out
+    are dropped by the first query made after the earliest one expires.
+    """
+
+    def __init__(self, intervals: Iterable[BlockedInterval] = ()):
+        self._intervals: List[BlockedInterval] = sorted(intervals)
+        self._by_id: Dict[str, BlockedInterval] = {i.booking_id: i for i in self._intervals}
+        self._starts: List[int] = []
+        self._prefix_max: List[int] = []
+        self._next_expiry: Optional[datetime] = None
+        self._reindex(0)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def _reindex(self, position: int) -> None:
+        holds = [i.hold_expires_at for i in self._intervals if i.hold_expires_at is not None]
+        self._next_expiry = min(holds) if holds else None
+        del self._starts[position:]
+        del self._prefix_max[position:]
+        for i in range(position, len(self._intervals)):
+            interval = self._intervals[i]
+            self._starts.append(interval.start)
+            best = self._prefix_max[i - 1] if i else i
+            if interval.blocked_until > self._intervals[best].blocked_until:
+                best = i
+            self._prefix_max.append(best)
+
+    def add(self, interval: BlockedInterval) -> None:
+        self.remove(interval.booking_id)
+        insort(self._intervals, interval)
+        self._by_id[interval.booking_id] = interval
+        self._reindex(bisect_left(self._intervals, interval))
+
+    def remove(self, booking_id: str) -> None:
+        interval = self._by_id.pop(booking_id, None)
+        if interval is None:
+            return
+        position = bisect_left(self._intervals, interval)
+        del self._intervals[position]
+        self._reindex(position)
+
+    def expire(self, now: datetime) -> int:
+        """Drop intervals whose hold ran out; returns how many were dropped"""
+        if self._next_expiry is None or now < self._next_expiry:
+            return 0
+        live = [
+            i for i in self._intervals
+            if i.hold_expires_at is None or i.hold_expires_at > now
+        ]
+        dropped = len(self._intervals) - len(live)
+        self._intervals = live
+        self._by_id = {i.booking_id: i for i in live}
+        self._reindex(0)
+        return dropped
+
+    def find_conflict(
+        self, start: int, end: int, now: Optional[datetime] = None
+    ) -> Optional[BlockedInterval]:
+        """Return the blocking interval overlapping [start, end), if any"""
+        if now is not None:
+            self.expire(now)
+        candidates = bisect_left(self._starts, end)
+        if not candidates:
+            return None
+        latest = self._intervals[self._prefix_max[candidates - 1]]
+        if latest.blocked_until > start:
+            return latest
+        return None
+
+    def gaps(self, start: int, end: int) -> Tuple[int, int]:
+        """Idle minutes before and after a free [start, end) on this vehicle"""
+        before = bisect_left(self._starts, start)
+        if before:
+            gap_before = start - self._intervals[self._prefix_max[before - 1]].blocked_until
+        else:
+            gap_before = start
+        after = bisect_left(self._starts, end)
+        if after < len(self._starts):
+            gap_after = self._starts[after] - end
+        else:
+            gap_after = MINUTES_PER_DAY - end
+        return gap_before, gap_after
+
+
+def vehicle_of(booking: dict) -> str:
+    return booking.get('vehicle_id') or DEFAULT_VEHICLE_ID
+
+
+class FleetDay:
+    """Blocked intervals of a single date, one ``DayIntervals`` per vehicle.
+
+    A slot is available when at least one vehicle has no conflict, so a
+    query costs one bisect per vehicle. Lanes are sorted once on
+    construction; pass ``now`` to queries so holds that ran out since are
+    skipped.
+    """
+
+    _EMPTY = DayIntervals()
+
+    def __init__(self, bookings: Iterable[dict] = ()):
+        intervals: Dict[str, List[BlockedInterval]] = {}
+        for booking in bookings:
+            intervals.setdefault(vehicle_of(booking), []).append(blocked_interval(booking))
+        self._lanes: Dict[str, DayIntervals] = {
+            vehicle_id: DayIntervals(lane) for vehicle_id, lane in intervals.items()
+        }
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def lane(self, vehicle_id: str) -> DayIntervals:
+        return self._lanes.get(vehicle_id, self._EMPTY)
+
+    def find_conflict(
+        self, start: int, end: int, vehicles: Iterable[str], now: Optional[datetime] = None
+    ) -> Optional[BlockedInterval]:
+        """None when some vehicle is free for [start, end).
+
+        Otherwise the conflict that frees up first, so the caller can tell
+        when the earliest vehicle becomes available.
+        """
+        earliest = None
+        for vehicle_id in vehicles:
+            conflict = self.lane(vehicle_id).find_conflict(start, end, now=now)
+            if conflict is None:
+                return None
+            if earliest is None or conflict.blocked_until < earliest.blocked_until:
+                earliest = conflict
+        return earliest
+
+    def best_fit(
+        self, start: int, end: int, vehicles: Iterable[str], now: Optional[datetime] = None
+    ) -> Optional[str]:
+        """Free vehicle leaving the least idle time around [start, end)"""
+        best, best_idle = None, None
+        for vehicle_id in vehicles:
+            lane = self.lane(vehicle_id)
+            if lane.find_conflict(start, end, now=now) is not None:
+                continue
+            idle = sum(lane.gaps(start, end))
+            if best_idle is None or idle < best_idle:
+                best, best_idle = vehicle_id, idle
+        return best
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight call.
+
+    The call runs as its own task, so a caller that goes away (for example a
+    disconnected client) does not cancel it for the others still waiting.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True for joined calls"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Retrieve the exception even when every caller was cancelled
+            task.exception()
+
+
+def is_terminal_status(status: Dict[str, Any]) -> bool:
+    """Whether a checkout status can no longer change"""
+    return (
+        status.get("payment_status") in ("paid", "no_payment_required")
+        or status.get("status") == "expired"
+    )
+
+
+class PaymentStatusCache:
+    """Checkout status lookups keyed by session id.
+
+    ``load_stored(session_id)`` returns a terminal status already recorded in
+    our database, or None. ``fetch(session_id)`` asks the payment provider.
+    Terminal statuses are kept until evicted, others for ``ttl_seconds``, and
+    concurrent lookups of one session share a single upstream call.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Dict[str, Any]]],
+        load_stored: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+        ttl_seconds: float = 3.0,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._fetch = fetch
+        self._load_stored = load_stored
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+            "in_flight": len(self._flights),
+        }
+
+    def _cached(self, session_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        status, expires_at = entry
+        if self._clock() >= expires_at:
+            del self._entries[session_id]
+            return None
+        self._entries.move_to_end(session_id)
+        return status
+
+    def put(self, session_id: str, status: Dict[str, Any]) -> None:
+        ttl = float("inf") if is_terminal_status(status) else self._ttl
+        self._entries[session_id] = (status, self._clock() + ttl)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str) -> None:
+        self._entries.pop(session_id, None)
+
+    async def _lookup(self, session_id: str) -> Dict[str, Any]:
+        stored = await self._load_stored(session_id)
+        if stored is not None:
+            self.store_hits += 1
+            status = stored
+        else:
+            self.misses += 1
+            status = await self._fetch(session_id)
+        self.put(session_id, status)
+        return status
+
+    async def get(self, session_id: str) -> Dict[str, Any]:
+        status = self._cached(session_id)
+        if status is not None:
+            self.hits += 1
+        else:
+            status, shared = await self._flights.do(session_id, lambda: self._lookup(session_id))
+            if shared:
+                self.coalesced += 1
+        return dict(status)
@@ -0,0 +1,127 @@
+"""Local stand-in for the Stripe Checkout API, for offline benchmarks and tests.
+
+Point the backend at it with ``STRIPE_API_BASE=http://127.0.0.1:12111`` and
+any ``sk_test_...`` key, then run ``python fake_stripe.py --port 12111``.
+Only the checkout session endpoints the backend uses are implemented.
+``FAKE_STRIPE_LATENCY_MS`` adds a fixed delay to every response.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+
+app = FastAPI(title="Fake Stripe")
+
+_sessions: Dict[str, dict] = {}
+_latency = float(os.environ.get('FAKE_STRIPE_LATENCY_MS', '0')) / 1000
+
+
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """Stripe-Signature header value for a webhook payload"""
+    timestamp = timestamp or int(time.time())
+    signed = f"{timestamp}.".encode() + payload
+    digest = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def checkout_completed_event(session_id: str) -> bytes:
+    """Body of a checkout.session.completed webhook for a known session"""
+    session = _sessions.get(session_id) or {"id": session_id, "metadata": {}}
+    event = {
+        "id": f"evt_{uuid.uuid4().hex}",
+        "object": "event",
+        "type": "checkout.session.completed",
+        "created": int(time.time()),
+        "data": {"object": {**session, "status": "complete", "payment_status": "paid"}},
+    }
+    return json.dumps(event).encode()
+
+
+def created_sessions() -> int:
+    """Checkout sessions created so far, to confirm the backend reached the fake"""
+    return len(_sessions)
+
+
+async def _delay() -> None:
+    if _latency:
+        await asyncio.sleep(_latency)
+
+
+def _form_amount(form) -> int:
+    for key in ("line_items[0][price_data][unit_amount]", "amount_total", "amount"):
+        if key in form:
+            return int(float(form[key]))
+    return 0
+
+
+@app.post("/v1/checkout/sessions")
+async def create_session(request: Request):
+    await _delay()
+    form = await request.form()
+    session_id = f"cs_test_{uuid.uuid4().hex}"
+    session = {
+        "id": session_id,
+        "object": "checkout.session",
+        "url": f"https://checkout.stripe.test/pay/{session_id}",
+        "status": "open",
+        "payment_status": "unpaid",
+        "amount_total": _form_amount(form),
+        "currency": form.get("currency", "usd"),
+        "expires_at": int(time.time()) + 24 * 3600,
+        "metadata": {
+            key[len("metadata["):-1]: value
+            for key, value in form.items() if key.startswith("metadata[")
+        },
+    }
+    _sessions[session_id] = session
+    return session
+
+
+@app.get("/v1/checkout/sessions/{session_id}")
+async def retrieve_session(session_id: str):
+    await _delay()
+    session = _sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail={
+            "error": {"type": "invalid_request_error", "message": f"No such checkout.session: {session_id}"}
+        })
+    return session
+
+
+@app.post("/_fake/sessions/{session_id}/pay")
+async def pay_session(session_id: str):
+    """Mark a session paid, as if the customer completed checkout"""
+    session = _sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    session.update(status="complete", payment_status="paid")
+    return session
+
+
+def serve_in_thread(port: int, host: str = "127.0.0.1"):
+    """Run the fake on a daemon thread; returns the started uvicorn server"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
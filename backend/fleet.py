@@ -0,0 +1,44 @@
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from availability import DEFAULT_VEHICLE_ID
+
+
+class Fleet:
+    """Ids of the active vehicles, cached for ``ttl_seconds``.
+
+    The fleet always has at least the default vehicle, which carries every
+    booking made before vehicles were tracked.
+    """
+
+    def __init__(self, collection, ttl_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self._collection = collection
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._vehicle_ids: Optional[List[str]] = None
+        self._expires_at = 0.0
+
+    async def ensure_default(self) -> None:
+        await self._collection.update_one(
+            {"id": DEFAULT_VEHICLE_ID},
+            {"$setOnInsert": {
+                "id": DEFAULT_VEHICLE_ID,
+                "name": "Vehicle 1",
+                "active": True,
+                "created_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+
+    async def vehicle_ids(self) -> List[str]:
+        if self._vehicle_ids is None or self._clock() >= self._expires_at:
+            vehicles = await self._collection.find(
+                {"active": True}, {"_id": 0, "id": 1}
+            ).sort([("created_at", 1), ("id", 1)]).to_list(None)
+            self._vehicle_ids = [v["id"] for v in vehicles] or [DEFAULT_VEHICLE_ID]
+            self._expires_at = self._clock() + self._ttl
+        return self._vehicle_ids
+
+    def invalidate(self) -> None:
+        self._vehicle_ids = None
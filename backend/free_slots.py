@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from availability import MINUTES_PER_DAY
+
+
+def date_range(start: date, end: date) -> List[str]:
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+def free_windows(
+    dates: List[str],
+    vehicles: List[str],
+    blocked: Iterable[Tuple[str, str, int, int]],
+    granularity: int,
+) -> Dict[str, List[Tuple[int, int]]]:
+    """Free [start, end) minute windows per date on at least one vehicle.
+
+    ``blocked`` yields ``(date, vehicle_id, start, blocked_until)`` intervals
+    (buffer included); intervals are clipped to their own day. Occupancy of
+    every (date, vehicle) row is built at once with a difference array, then
+    reduced to ``granularity`` minute buckets, so windows start and end on
+    bucket boundaries and any bucket touched by a booking counts as taken.
+    Every window is free on a single vehicle; windows of different vehicles
+    may overlap, but none lies inside another.
+    """
+    if MINUTES_PER_DAY % granularity:
+        raise ValueError("granularity must divide a day evenly")
+
+    lanes = len(vehicles)
+    row_of = {(d, v): i * lanes + j for i, d in enumerate(dates) for j, v in enumerate(vehicles)}
+    rows, starts, ends = [], [], []
+    for day, vehicle_id, start, blocked_until in blocked:
+        row = row_of.get((day, vehicle_id))
+        if row is not None:
+            rows.append(row)
+            starts.append(start)
+            ends.append(blocked_until)
+
+    delta = np.zeros((len(row_of), MINUTES_PER_DAY + 1), dtype=np.int16)
+    if rows:
+        rows_arr = np.asarray(rows, dtype=np.intp)
+        starts_arr = np.clip(np.asarray(starts, dtype=np.intp), 0, MINUTES_PER_DAY)
+        ends_arr = np.clip(np.asarray(ends, dtype=np.intp), 0, MINUTES_PER_DAY)
+        np.add.at(delta, (rows_arr, starts_arr), 1)
+        np.add.at(delta, (rows_arr, ends_arr), -1)
+    occupied = np.cumsum(delta, axis=1, dtype=np.int32)[:, :MINUTES_PER_DAY] > 0
+
+    buckets = MINUTES_PER_DAY // granularity
+    free = ~occupied.reshape(len(row_of), buckets, granularity).any(axis=2)
+
+    # +1 where a free run starts, -1 one past where it ends
+    edges = np.diff(np.pad(free, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+
+    runs: Dict[str, set] = {d: set() for d in dates}
+    for row, start, end in zip(run_rows.tolist(), run_starts.tolist(), run_ends.tolist()):
+        runs[dates[row // lanes]].add((start * granularity, end * granularity))
+
+    windows: Dict[str, List[Tuple[int, int]]] = {}
+    for day, day_runs in runs.items():
+        kept: List[Tuple[int, int]] = []
+        furthest = -1
+        # Longest first among equal starts, so contained runs are skipped
+        for start, end in sorted(day_runs, key=lambda run: (run[0], -run[1])):
+            if end > furthest:
+                kept.append((start, end))
+                furthest = end
+        windows[day] = kept
+    return windows
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from caching import SingleFlight
+
+
+class CachedPing:
+    """Outcome of the last dependency ping, reused for ``ttl_seconds``.
+
+    Probes from the orchestrator and load balancers share one ping per TTL
+    and concurrent probes join the ping in flight, so health checks never
+    add more than one round trip per TTL to the database. A ping slower
+    than ``timeout_seconds`` counts as failed.
+    """
+
+    def __init__(
+        self,
+        ping: Callable[[], Awaitable[Any]],
+        ttl_seconds: float = 2.0,
+        timeout_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._ping = ping
+        self._ttl = ttl_seconds
+        self._timeout = timeout_seconds
+        self._clock = clock
+        self._flight = SingleFlight()
+        self._result: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self.pings = 0
+
+    async def check(self) -> Dict[str, Any]:
+        if self._result is not None and self._clock() < self._expires_at:
+            return self._result
+        result, _ = await self._flight.do("ping", self._ping_once)
+        return result
+
+    async def _ping_once(self) -> Dict[str, Any]:
+        self.pings += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._ping(), self._timeout)
+            result = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+        except Exception as exc:
+            result = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        self._result = result
+        self._expires_at = self._clock() + self._ttl
+        return result
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def live_hold_filter(now: datetime) -> Dict[str, Any]:
+    """Bookings whose hold has not run out; paid bookings carry no hold"""
+    return {"$or": [{"hold_expires_at": None}, {"hold_expires_at": {"$gt": now}}]}
+
+
+class HoldSweeper:
+    """Moves pending bookings whose hold ran out to ``expired``.
+
+    Each pass expires at most ``batch_size`` bookings per round trip until
+    none are left; after each batch ``on_expired`` is awaited with the
+    bookings that were actually expired (a payment that landed in between
+    wins). Bookings are stamped with the pass that expired them, so when
+    several workers sweep at once each booking is reported by one only.
+    """
+
+    def __init__(
+        self,
+        collection,
+        on_expired: Callable[[List[dict]], Awaitable[None]],
+        projection: Dict[str, Any],
+        interval_seconds: float = 60.0,
+        batch_size: int = 500,
+        clock: Callable[[], datetime] = utc_now,
+    ):
+        self._collection = collection
+        self._on_expired = on_expired
+        self._projection = {**projection, "_id": 0, "id": 1, "payment_status": 1}
+        self._interval = interval_seconds
+        self._batch_size = batch_size
+        self._clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self.expired_total = 0
+        self.passes = 0
+        self.last_pass_seconds: Optional[float] = None
+        self.last_pass_expired = 0
+        self.last_pass_at: Optional[datetime] = None
+
+    def _due(self, now: datetime) -> Dict[str, Any]:
+        return {"payment_status": "pending", "hold_expires_at": {"$lte": now}}
+
+    async def sweep(self) -> int:
+        """Expire every due hold; returns how many bookings were expired"""
+        started = time.perf_counter()
+        now = self._clock()
+        pass_id = uuid.uuid4().hex
+        expired = 0
+        while True:
+            due = await self._collection.find(
+                self._due(now), {"_id": 0, "id": 1}
+            ).limit(self._batch_size).to_list(self._batch_size)
+            if not due:
+                break
+            ids = [booking["id"] for booking in due]
+            await self._collection.update_many(
+                {"id": {"$in": ids}, **self._due(now)},
+                {"$set": {"payment_status": "expired", "expired_by": pass_id}}
+            )
+            changed: List[dict] = await self._collection.find(
+                {"id": {"$in": ids}, "payment_status": "expired", "expired_by": pass_id}, self._projection
+            ).to_list(len(ids))
+            if changed:
+                await self._on_expired(changed)
+            expired += len(changed)
+            if len(due) < self._batch_size:
+                break
+
+        self.passes += 1
+        self.expired_total += expired
+        self.last_pass_expired = expired
+        self.last_pass_seconds = time.perf_counter() - started
+        self.last_pass_at = now
+        return expired
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Hold sweep failed")
+            await asyncio.sleep(self._interval)
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._sweep_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def stats(self) -> Dict[str, Any]:
+        backlog = await self._collection.count_documents(self._due(self._clock()))
+        rate = None
+        if self.last_pass_seconds:
+            rate = self.last_pass_expired / self.last_pass_seconds
+        return {
+            "backlog": backlog,
+            "expired_total": self.expired_total,
+            "passes": self.passes,
+            "last_pass_expired": self.last_pass_expired,
+            "last_pass_seconds": self.last_pass_seconds,
+            "last_pass_per_second": rate,
+            "last_pass_at": self.last_pass_at,
+        }
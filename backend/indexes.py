@@ -0,0 +1,156 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from availability import BLOCKING_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str
+    options: Dict[str, Any] = {}
+
+
+class HotQuery(NamedTuple):
+    collection: str
+    filter: Dict[str, Any]
+    index: str
+    sort: Optional[List[Tuple[str, int]]] = None
+
+
+# Indexes the server relies on
+INDEXES = [
+    IndexSpec("bookings", [("id", 1)], "id_1", {"unique": True}),
+    # Most bookings have no session yet, so only index the ones that do
+    IndexSpec("bookings", [("session_id", 1)], "session_id_1", {
+        "unique": True, "partialFilterExpression": {"session_id": {"$gt": ""}}
+    }),
+    IndexSpec("bookings", [("date", 1), ("payment_status", 1)], "date_1_payment_status_1"),
+    # Expired hold sweeper
+    IndexSpec("bookings", [("payment_status", 1), ("hold_expires_at", 1)],
+              "payment_status_1_hold_expires_at_1"),
+    # Keyset pagination order of GET /api/bookings
+    IndexSpec("bookings", [("created_at", 1), ("id", 1)], "created_at_1_id_1"),
+    IndexSpec("payment_transactions", [("id", 1)], "id_1", {"unique": True}),
+    IndexSpec("vehicles", [("id", 1)], "id_1", {"unique": True}),
+    # Lets a re-run contacts import count rows already present as duplicates
+    IndexSpec("contact_submissions", [("id", 1)], "id_1", {"unique": True}),
+    IndexSpec("payment_transactions", [("session_id", 1)], "session_id_1", {"unique": True}),
+    IndexSpec("webhook_events", [("status", 1), ("received_at", 1)], "status_1_received_at_1"),
+    # Processed events are kept for 30 days for auditing
+    IndexSpec("webhook_events", [("processed_at", 1)], "processed_at_1", {
+        "expireAfterSeconds": 30 * 24 * 3600
+    }),
+]
+
+# Queries in server.py and holds.py that must be answered by an index
+# scan. Values are placeholders.
+HOT_QUERIES = [
+    HotQuery("bookings", {"id": "x"}, "id_1"),
+    HotQuery("bookings", {"date": "x", "payment_status": {"$in": list(BLOCKING_STATUSES)}},
+             "date_1_payment_status_1"),
+    HotQuery("bookings", {"payment_status": "pending",
+                          "hold_expires_at": {"$lte": datetime(2030, 1, 1, tzinfo=timezone.utc)}},
+             "payment_status_1_hold_expires_at_1"),
+    HotQuery("bookings", {}, "created_at_1_id_1", sort=[("created_at", 1), ("id", 1)]),
+    HotQuery("payment_transactions", {"session_id": "cs_x", "payment_status": {"$ne": "paid"}},
+             "session_id_1"),
+    HotQuery("payment_transactions", {"session_id": "cs_x", "payment_status": "pending"},
+             "session_id_1"),
+]
+
+# Options that make two indexes with the same keys different
+_COMPARED_OPTIONS = ("unique", "partialFilterExpression", "sparse", "expireAfterSeconds")
+
+
+class IndexDriftError(RuntimeError):
+    pass
+
+
+def _winning_indexes(plan: Dict[str, Any]) -> List[str]:
+    """Index names used anywhere in a winning plan tree"""
+    names = []
+    if plan.get("indexName"):
+        names.append(plan["indexName"])
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            names.extend(_winning_indexes(plan[child_key]))
+    for child in plan.get("inputStages", []):
+        names.extend(_winning_indexes(child))
+    return names
+
+
+def _differences(spec: IndexSpec, existing: Dict[str, Any]) -> List[str]:
+    differences = []
+    if [tuple(k) for k in existing["key"]] != [tuple(k) for k in spec.keys]:
+        differences.append(f"keys {existing['key']} != {spec.keys}")
+    for option in _COMPARED_OPTIONS:
+        if existing.get(option) != spec.options.get(option):
+            differences.append(f"{option} {existing.get(option)!r} != {spec.options.get(option)!r}")
+    return differences
+
+
+async def ensure_indexes(db, strict: bool = False) -> Dict[str, List[str]]:
+    """Create missing indexes and verify the hot queries use them.
+
+    Returns a report with ``created``, ``drift`` and ``unused`` entries. With
+    ``strict`` any drift or unindexed hot query raises ``IndexDriftError``
+    instead of only being logged.
+    """
+    report: Dict[str, List[str]] = {"created": [], "drift": [], "unused": []}
+
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in INDEXES:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for collection_name, specs in by_collection.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        declared = {spec.name for spec in specs}
+
+        for spec in specs:
+            label = f"{collection_name}.{spec.name}"
+            if spec.name in existing:
+                report["drift"].extend(
+                    f"{label}: {difference}" for difference in _differences(spec, existing[spec.name])
+                )
+                continue
+            try:
+                # create_index is a no-op when an identical index already exists
+                await collection.create_index(spec.keys, name=spec.name, **spec.options)
+                report["created"].append(label)
+            except OperationFailure as exc:
+                report["drift"].append(f"{label}: {exc}")
+
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                report["unused"].append(f"{collection_name}.{name}")
+
+    for query in HOT_QUERIES:
+        cursor = db[query.collection].find(query.filter)
+        if query.sort:
+            cursor = cursor.sort(query.sort)
+        explain = await cursor.explain()
+        used = _winning_indexes(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        if query.index not in used:
+            sorted_by = f" sorted by {query.sort}" if query.sort else ""
+            report["drift"].append(
+                f"{query.collection} query {query.filter}{sorted_by} uses {used or 'a collection scan'} "
+                f"instead of {query.index}"
+            )
+
+    for label in report["created"]:
+        logger.info("Created index %s", label)
+    for label in report["unused"]:
+        logger.info("Index %s is not declared in indexes.py", label)
+    for problem in report["drift"]:
+        logger.warning("Index drift: %s", problem)
+
+    if strict and report["drift"]:
+        raise IndexDriftError("; ".join(report["drift"]))
+    return report
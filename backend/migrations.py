@@ -0,0 +1,224 @@
+"""One-off data migrations, run as ``python migrations.py <command>``.
+
+Every migration streams the documents it still has to touch, writes them
+back in unordered bulk batches and only matches documents that are not
+migrated yet, so it can run against a live database and be re-run safely.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from pathlib import Path
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from availability import booking_minutes
+from holds import utc_now
+from rollups import BookingMinutesMissing, rebuild_rollups
+from schedules import rebuild_schedules
+
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+app = typer.Typer(help="Data migrations for the chauffeur booking database")
+
+
+def _database():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    return client, client[os.environ['DB_NAME']]
+
+
+async def backfill_booking_minutes(db, batch_size: int = 500) -> int:
+    """Store start/end/blocked-until minutes on bookings that lack them"""
+    missing = {"blocked_until_minutes": {"$exists": False}}
+    cursor = db.bookings.find(
+        missing, {"_id": 1, "start_time": 1, "end_time": 1}, batch_size=batch_size
+    )
+
+    updated = 0
+    batch = []
+    async for booking in cursor:
+        batch.append(UpdateOne(
+            {"_id": booking["_id"], **missing},
+            {"$set": booking_minutes(booking["start_time"], booking["end_time"])}
+        ))
+        if len(batch) >= batch_size:
+            result = await db.bookings.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+    if batch:
+        result = await db.bookings.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+    return updated
+
+
+async def backfill_booking_holds(db, batch_size: int = 500, hold_minutes: int = 30) -> int:
+    """Give pending bookings without a hold one that ends hold_minutes after creation"""
+    missing = {"payment_status": "pending", "hold_expires_at": {"$exists": False}}
+    cursor = db.bookings.find(missing, {"_id": 1, "created_at": 1}, batch_size=batch_size)
+
+    updated = 0
+    batch = []
+    async for booking in cursor:
+        created_at = booking.get("created_at")
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        if not isinstance(created_at, datetime):
+            created_at = datetime.now(timezone.utc)
+        batch.append(UpdateOne(
+            {"_id": booking["_id"], **missing},
+            {"$set": {"hold_expires_at": created_at + timedelta(minutes=hold_minutes)}}
+        ))
+        if len(batch) >= batch_size:
+            result = await db.bookings.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+    if batch:
+        result = await db.bookings.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+    return updated
+
+
+# Collections and the timestamp fields older code stored as ISO strings
+TIMESTAMP_FIELDS = {
+    "bookings": ("created_at",),
+    "contact_submissions": ("created_at",),
+    "payment_transactions": ("created_at", "updated_at"),
+    "vehicles": ("created_at",),
+}
+
+
+def _parse_timestamp(value: str):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # Strings without an offset were always written in UTC
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def convert_string_timestamps(db, batch_size: int = 500) -> int:
+    """Turn ISO string timestamps into BSON dates so they sort and range-query as dates"""
+    updated = 0
+    for name, fields in TIMESTAMP_FIELDS.items():
+        collection = db[name]
+        cursor = collection.find(
+            {"$or": [{field: {"$type": "string"}} for field in fields]},
+            {field: 1 for field in fields},
+            batch_size=batch_size
+        )
+        batch = []
+        async for doc in cursor:
+            strings = {f: doc[f] for f in fields if isinstance(doc.get(f), str)}
+            parsed = {f: _parse_timestamp(v) for f, v in strings.items()}
+            converted = {f: v for f, v in parsed.items() if v is not None}
+            if not converted:
+                continue
+            # Only overwrite the exact strings that were read
+            batch.append(UpdateOne(
+                {"_id": doc["_id"], **{f: strings[f] for f in converted}},
+                {"$set": converted}
+            ))
+            if len(batch) >= batch_size:
+                result = await collection.bulk_write(batch, ordered=False)
+                updated += result.modified_count
+                batch = []
+        if batch:
+            result = await collection.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+    return updated
+
+
+def _run(migration, batch_size: int) -> None:
+    async def run():
+        client, db = _database()
+        try:
+            started = time.perf_counter()
+            updated = await migration(db, batch_size=batch_size)
+            elapsed = time.perf_counter() - started
+            name = getattr(migration, "func", migration).__name__
+            typer.echo(f"{name}: updated {updated} documents in {elapsed:.2f}s")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@app.command("booking-minutes")
+def booking_minutes_command(batch_size: int = typer.Option(500, min=1)):
+    """Backfill start_minutes/end_minutes/blocked_until_minutes on bookings."""
+    _run(backfill_booking_minutes, batch_size)
+
+
+
+@app.command("booking-holds")
+def booking_holds_command(batch_size: int = typer.Option(500, min=1)):
+    """Backfill hold_expires_at on pending bookings created before holds existed."""
+    hold_minutes = int(os.environ.get('BOOKING_HOLD_MINUTES', '30'))
+    _run(partial(backfill_booking_holds, hold_minutes=hold_minutes), batch_size)
+
+
+@app.command("timestamps")
+def timestamps_command(batch_size: int = typer.Option(500, min=1)):
+    """Convert created_at/updated_at ISO strings to BSON dates."""
+    _run(convert_string_timestamps, batch_size)
+
+
+@app.command("daily-schedules")
+def daily_schedules_command(
+    batch_size: int = typer.Option(1000, min=1),
+    verify: bool = typer.Option(False, "--verify", help="Only report dates that differ."),
+    from_date: str = typer.Option(None, "--from", help="First date (YYYY-MM-DD) to rebuild."),
+    to_date: str = typer.Option(None, "--to", help="Last date (YYYY-MM-DD) to rebuild."),
+):
+    """Recompute daily_schedules from bookings, or verify them with --verify."""
+    async def run():
+        client, db = _database()
+        try:
+            stats = await rebuild_schedules(
+                db, utc_now(), verify_only=verify, batch_size=batch_size,
+                from_date=from_date, to_date=to_date,
+            )
+        finally:
+            client.close()
+        typer.echo(
+            f"daily_schedules: {stats['bookings']} bookings over {stats['dates']} dates "
+            f"in {stats['seconds']:.2f}s ({stats['bookings_per_second'] or 0:.0f} bookings/s), "
+            f"{stats['mismatched']} mismatched, {stats['written']} rewritten"
+        )
+        if verify and stats['mismatched']:
+            raise typer.Exit(code=1)
+
+    asyncio.run(run())
+
+
+@app.command("daily-rollups")
+def daily_rollups_command(
+    from_date: str = typer.Option(None, "--from", help="First date (YYYY-MM-DD) to rebuild."),
+    to_date: str = typer.Option(None, "--to", help="Last date (YYYY-MM-DD) to rebuild."),
+):
+    """Recompute daily_rollups from bookings with an aggregation pipeline."""
+    async def run():
+        client, db = _database()
+        try:
+            stats = await rebuild_rollups(db, from_date, to_date)
+        except BookingMinutesMissing as exc:
+            typer.echo(f"daily_rollups: {exc}", err=True)
+            raise typer.Exit(code=1)
+        finally:
+            client.close()
+        typer.echo(
+            f"daily_rollups: rebuilt {stats['dates']} dates, deleted {stats['deleted']} "
+            f"in {stats['seconds']:.2f}s"
+        )
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,86 @@
+"""API models, shared by server.py and the data tools"""
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+
+
+class BookingCreate(BaseModel):
+    date: str
+    start_time: str
+    end_time: str
+    pickup_location: str
+    dropoff_location: str
+    full_name: str
+    email: EmailStr
+    phone: str
+    duration_hours: float
+    total_price: float
+    deposit_amount: float
+    special_requests: Optional[str] = None
+
+class Booking(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    date: str
+    start_time: str
+    end_time: str
+    pickup_location: str
+    dropoff_location: str
+    full_name: str
+    email: str
+    phone: str
+    duration_hours: float
+    total_price: float
+    deposit_amount: float
+    special_requests: Optional[str] = None
+    payment_status: str = "pending"
+    session_id: Optional[str] = None
+    vehicle_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ContactSubmission(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    email: EmailStr
+    phone: str
+    message: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ContactCreate(BaseModel):
+    name: str
+    email: EmailStr
+    phone: str
+    message: str
+
+class PaymentTransaction(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str
+    booking_id: str
+    amount: float
+    currency: str = "usd"
+    payment_status: str = "pending"
+    metadata: Optional[Dict] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class CheckoutRequest(BaseModel):
+    booking_id: str
+    origin_url: str
+
+class Vehicle(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    active: bool = True
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class VehicleCreate(BaseModel):
+    name: str
@@ -0,0 +1,156 @@
+import asyncio
+import cProfile
+import hmac
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Header that asks for one request to be profiled; its value is the token
+PROFILE_HEADER = b"x-profile-token"
+
+_NAME = re.compile(r"^\d+-[0-9a-f]{12}$")
+
+
+class ProfileStore:
+    """Bounded on-disk ring of cProfile captures.
+
+    Each capture is a ``<name>.prof`` pstats file plus a ``<name>.json``
+    with the request it came from. Names start with the capture time, so
+    once more than ``max_profiles`` exist the oldest are deleted. Several
+    workers can share one directory.
+    """
+
+    def __init__(self, directory: Path, max_profiles: int = 50):
+        self.directory = Path(directory)
+        self._max_profiles = max_profiles
+
+    @staticmethod
+    def new_name() -> str:
+        return f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:12]}"
+
+    def save(self, name: str, profile: cProfile.Profile, meta: Dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(self.directory / f"{name}.prof")
+        (self.directory / f"{name}.json").write_text(json.dumps(meta))
+        self._trim()
+
+    def _trim(self) -> None:
+        captures = sorted(self.directory.glob("*.prof"))
+        for old in captures[:-self._max_profiles]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".json").unlink(missing_ok=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Captures, newest first"""
+        captures = []
+        for path in sorted(self.directory.glob("*.prof"), reverse=True):
+            try:
+                meta = json.loads(path.with_suffix(".json").read_text())
+            except (OSError, ValueError):
+                meta = {}
+            captures.append({"name": path.stem, "bytes": path.stat().st_size, **meta})
+        return captures
+
+    def path(self, name: str) -> Optional[Path]:
+        """File of a capture, or None for unknown (or malformed) names"""
+        if not _NAME.match(name):
+            return None
+        path = self.directory / f"{name}.prof"
+        return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that runs selected requests under cProfile.
+
+    A request is profiled when it carries ``X-Profile-Token: <token>`` or,
+    independently, with probability ``sample_rate``. Only one request is
+    profiled at a time per process (cProfile is process-wide in a thread);
+    others that would have been picked are served normally. Because the
+    event loop keeps running other tasks while the request awaits I/O, a
+    capture also shows their work; under sampling that is the real cost
+    of the loop while the request was in flight. Paths under
+    ``skip_prefixes`` (the download endpoints) are never profiled. Only add
+    the middleware when profiling is configured, so it costs nothing
+    otherwise.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        token: Optional[str] = None,
+        sample_rate: float = 0.0,
+        skip_prefixes: Tuple[str, ...] = (),
+        rand: Callable[[], float] = random.random,
+    ):
+        self.app = app
+        self._skip_prefixes = skip_prefixes
+        self._store = store
+        self._token = token.encode() if token else None
+        self._sample_rate = sample_rate
+        self._rand = rand
+        self._active = threading.Lock()
+        self.captured = 0
+
+    def _wanted(self, scope) -> Optional[str]:
+        if scope["path"].startswith(self._skip_prefixes):
+            return None
+        if self._token is not None:
+            for key, value in scope["headers"]:
+                if key == PROFILE_HEADER and hmac.compare_digest(value, self._token):
+                    return "token"
+        if self._sample_rate and self._rand() < self._sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._wanted(scope)
+        if trigger is None or not self._active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        name = self._store.new_name()
+        status = None
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"x-profile-id", name.encode())],
+                }
+            await send(message)
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.disable()
+            self._active.release()
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status,
+                "trigger": trigger,
+                "duration_seconds": time.perf_counter() - started,
+            }
+            try:
+                await asyncio.to_thread(self._store.save, name, profile, meta)
+                self.captured += 1
+            except OSError:
+                logger.exception("Could not store profile %s", name)
@@ -0,0 +1,70 @@
+import hashlib
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding shared by JSON and NDJSON responses"""
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def adapter(tp: Any) -> TypeAdapter:
+    """TypeAdapter for ``tp``, built once per type"""
+    return TypeAdapter(tp)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson.
+
+    Datetimes come out as ISO 8601 with a ``Z`` suffix for UTC, exactly
+    like Pydantic's JSON output, so switching between the two is invisible
+    to clients.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted_response(
+    content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None
+) -> FastJSONResponse:
+    """Respond with documents already shaped like the response model.
+
+    Returning a Response skips FastAPI's ``response_model`` validation; use
+    it only for rows read with a projection of the model's fields.
+    """
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def model_response(
+    tp: Any, value: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    """Serialize already validated models straight to JSON bytes"""
+    return Response(
+        adapter(tp).dump_json(value),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def strong_etag(*parts: Any) -> str:
+    """Strong ETag for a representation identified by ``parts``"""
+    return '"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response when ``If-None-Match`` already names ``etag``"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    if "*" in tags or etag in tags:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
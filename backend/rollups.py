@@ -0,0 +1,191 @@
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from availability import BLOCKING_STATUSES, MINUTES_PER_DAY, blocked_interval
+
+# Sums kept per date and payment status
+ROLLUP_FIELDS = ("bookings", "booked_hours", "blocked_minutes", "total_price", "deposit_amount")
+
+# Booking fields the rollup amounts are computed from
+ROLLUP_SOURCE_PROJECTION = {
+    "_id": 0, "id": 1, "date": 1, "payment_status": 1, "duration_hours": 1,
+    "total_price": 1, "deposit_amount": 1, "start_minutes": 1, "blocked_until_minutes": 1,
+    "start_time": 1, "end_time": 1,
+}
+
+
+class BookingMinutesMissing(RuntimeError):
+    """Bookings predate the minute fields; run ``migrations.py booking-minutes``"""
+
+
+def booking_amounts(booking: dict) -> Dict[str, float]:
+    """What one booking adds to its date's sums; blocked minutes include the buffer"""
+    interval = blocked_interval(booking)
+    return {
+        "bookings": 1,
+        "booked_hours": booking.get("duration_hours") or 0,
+        "blocked_minutes": interval.blocked_until - interval.start,
+        "total_price": booking.get("total_price") or 0,
+        "deposit_amount": booking.get("deposit_amount") or 0,
+    }
+
+
+class DailyRollups:
+    """One document per date summing its bookings by payment status.
+
+    ``{"_id": "2030-01-15", "paid": {"bookings": 3, "total_price": 450, ...},
+    "pending": {...}, "expired": {...}}``. Every status change moves the
+    booking's amounts from the old status to the new one with a single
+    upserted ``$inc``, so concurrent writers never conflict and reading a
+    range costs one document per date. ``rebuild_rollups`` recomputes them
+    from bookings should they ever drift.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    @staticmethod
+    def _add(inc: Dict[str, float], booking: dict, from_status: Optional[str], to_status: Optional[str]) -> None:
+        for status, sign in ((from_status, -1), (to_status, 1)):
+            if status is None:
+                continue
+            for field, amount in booking_amounts(booking).items():
+                key = f"{status}.{field}"
+                inc[key] = inc.get(key, 0) + sign * amount
+
+    async def move(self, booking: dict, from_status: Optional[str], to_status: Optional[str]) -> None:
+        """Move a booking between statuses; None means created or deleted"""
+        await self.move_many([booking], from_status, to_status)
+
+    async def move_many(self, bookings: Iterable[dict], from_status: Optional[str], to_status: Optional[str]) -> None:
+        """Move bookings with one ``$inc`` per date"""
+        if from_status == to_status:
+            return
+        by_date: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for booking in bookings:
+            self._add(by_date[booking["date"]], booking, from_status, to_status)
+        for date, inc in by_date.items():
+            await self._collection.update_one({"_id": date}, {"$inc": inc}, upsert=True)
+
+    async def range(self, from_date: str, to_date: str) -> List[dict]:
+        return await self._collection.find(
+            {"_id": {"$gte": from_date, "$lte": to_date}}
+        ).sort("_id", 1).to_list(None)
+
+
+def summarize(date: str, rollup: Optional[dict], vehicle_count: int) -> Dict[str, Any]:
+    """Revenue and utilization of one date from its rollup"""
+    rollup = rollup or {}
+    sums = {
+        status: {field: rollup.get(status, {}).get(field, 0) for field in ROLLUP_FIELDS}
+        for status in ("paid", "pending")
+    }
+    paid, pending = sums["paid"], sums["pending"]
+    blocked_minutes = sum(sums[status]["blocked_minutes"] for status in BLOCKING_STATUSES)
+    return {
+        "date": date,
+        "bookings": paid["bookings"] + pending["bookings"],
+        "booked_hours": paid["booked_hours"] + pending["booked_hours"],
+        "revenue": paid["total_price"],
+        "deposits_collected": paid["deposit_amount"],
+        "deposits_pending": pending["deposit_amount"],
+        # Paid bookings have only paid their deposit; the rest is due on the day
+        "outstanding_balance": paid["total_price"] - paid["deposit_amount"],
+        "blocked_minutes": blocked_minutes,
+        "utilization": blocked_minutes / (vehicle_count * MINUTES_PER_DAY) if vehicle_count else None,
+        "cancelled": rollup.get("cancelled", {}).get("bookings", 0),
+        "expired": rollup.get("expired", {}).get("bookings", 0),
+        # Paid after losing their slot; each needs a refund or a new vehicle
+        "paid_unassigned": rollup.get("paid_unassigned", {}).get("bookings", 0),
+    }
+
+
+def summarize_range(days: List[Dict[str, Any]], vehicle_count: int) -> Dict[str, Any]:
+    """Totals of ``summarize`` results over several dates"""
+    totals = {
+        key: sum(day[key] for day in days)
+        for key in (
+            "bookings", "booked_hours", "revenue", "deposits_collected", "deposits_pending",
+            "outstanding_balance", "blocked_minutes", "cancelled", "expired", "paid_unassigned",
+        )
+    }
+    capacity = vehicle_count * MINUTES_PER_DAY * len(days)
+    totals["utilization"] = totals["blocked_minutes"] / capacity if capacity else None
+    return totals
+
+
+def _sums_by_status() -> Dict[str, Any]:
+    sums = {"bookings": {"$sum": 1}}
+    for field in ("booked_hours", "total_price", "deposit_amount"):
+        source = "duration_hours" if field == "booked_hours" else field
+        sums[field] = {"$sum": f"${source}"}
+    # Every booking has the minute fields; rebuild_rollups checks first
+    sums["blocked_minutes"] = {"$sum": {"$subtract": ["$blocked_until_minutes", "$start_minutes"]}}
+    return sums
+
+
+async def rebuild_rollups(
+    db, from_date: Optional[str] = None, to_date: Optional[str] = None
+) -> Dict[str, Any]:
+    """Recompute daily_rollups from bookings, for every date or a range.
+
+    The grouping runs inside MongoDB and ``$merge`` replaces each date's
+    document; rollups of dates in the range that no longer have bookings
+    are deleted. Status changes landing while it runs can be lost, so run
+    it when traffic is quiet, or run it twice.
+
+    Blocked minutes are summed from the stored minute fields, so bookings
+    still lacking them would disagree with the incremental rollups, which
+    fall back to the time strings; ``BookingMinutesMissing`` is raised
+    instead until ``migrations.py booking-minutes`` has run.
+    """
+    started = time.perf_counter()
+    dates: Dict[str, str] = {}
+    if from_date:
+        dates["$gte"] = from_date
+    if to_date:
+        dates["$lte"] = to_date
+    run_id = uuid.uuid4().hex
+
+    legacy = {"$or": [{"start_minutes": {"$exists": False}}, {"blocked_until_minutes": {"$exists": False}}]}
+    if dates:
+        legacy["date"] = dates
+    if await db.bookings.count_documents(legacy, limit=1):
+        raise BookingMinutesMissing(
+            "bookings without start_minutes/blocked_until_minutes; run "
+            "`python migrations.py booking-minutes` first"
+        )
+
+    pipeline = [
+        {"$group": {
+            "_id": {"date": "$date", "status": {"$ifNull": ["$payment_status", "unknown"]}},
+            **_sums_by_status(),
+        }},
+        {"$group": {
+            "_id": "$_id.date",
+            "statuses": {"$push": {
+                "k": "$_id.status",
+                "v": {field: f"${field}" for field in ROLLUP_FIELDS},
+            }},
+        }},
+        {"$replaceWith": {"$mergeObjects": [
+            {"_id": "$_id", "rebuild": run_id}, {"$arrayToObject": "$statuses"}
+        ]}},
+        {"$merge": {"into": "daily_rollups", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    if dates:
+        pipeline.insert(0, {"$match": {"date": dates}})
+    await db.bookings.aggregate(pipeline).to_list(None)
+
+    stale = {"rebuild": {"$ne": run_id}}
+    if dates:
+        stale["_id"] = dates
+    deleted = await db.daily_rollups.delete_many(stale)
+    rebuilt = await db.daily_rollups.count_documents({"rebuild": run_id})
+    return {
+        "dates": rebuilt,
+        "deleted": deleted.deleted_count,
+        "seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,260 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from availability import BLOCKING_STATUSES, FleetDay, blocked_interval, vehicle_of
+from holds import live_hold_filter
+
+
+class SlotTaken(Exception):
+    """No vehicle is free for the requested slot"""
+
+
+class ScheduleContention(Exception):
+    """The date's schedule kept changing underneath every attempt"""
+
+
+def schedule_entry(booking: dict) -> Dict[str, Any]:
+    """Compact interval stored in a daily schedule for a booking"""
+    interval = blocked_interval(booking)
+    return {
+        "id": booking['id'],
+        "vehicle_id": vehicle_of(booking),
+        "start_minutes": interval.start,
+        "blocked_until_minutes": interval.blocked_until,
+        "payment_status": booking['payment_status'],
+        "hold_expires_at": interval.hold_expires_at,
+    }
+
+
+def live_entries(entries: Iterable[dict], now: datetime) -> List[dict]:
+    """Entries still blocking at ``now``: paid ones and unexpired holds"""
+    return [
+        e for e in entries
+        if e.get('hold_expires_at') is None or e['hold_expires_at'] > now
+    ]
+
+
+def _sorted(entries: List[dict]) -> List[dict]:
+    return sorted(entries, key=lambda e: (e["start_minutes"], e["id"]))
+
+
+def _entry_key(entry: dict) -> tuple:
+    return (
+        entry["id"], entry["vehicle_id"], entry["start_minutes"],
+        entry["blocked_until_minutes"], entry["payment_status"], entry.get("hold_expires_at"),
+    )
+
+
+class DailySchedules:
+    """One versioned document per date holding its sorted blocked intervals.
+
+    Reservations read the document, pick a vehicle in memory and write the
+    new interval list back only if ``version`` is unchanged. Overlapping
+    reservations therefore fail with ``SlotTaken`` instead of both landing,
+    while non-overlapping ones on the same date simply retry, without any
+    lock. Missing documents are seeded from ``load_bookings(date)``.
+
+    ``version`` doubles as the date's change counter: every booking write
+    bumps it after the booking itself is written, so a reader that takes
+    the version before reading bookings never pairs it with older data.
+    It also keys the in-process ``FleetDay`` of the most recently used dates.
+    """
+
+    def __init__(
+        self,
+        collection,
+        load_bookings: Callable[[str], Awaitable[Iterable[dict]]],
+        max_attempts: int = 10,
+        max_cached_days: int = 64,
+    ):
+        self._collection = collection
+        self._load_bookings = load_bookings
+        self._max_attempts = max_attempts
+        self._fleet_days: "OrderedDict[str, Tuple[int, FleetDay]]" = OrderedDict()
+        self._max_cached_days = max_cached_days
+        self.conflicts = 0
+        self.retries = 0
+
+    async def get(self, date: str) -> dict:
+        schedule = await self._collection.find_one({"_id": date})
+        if schedule is not None:
+            return schedule
+        bookings = await self._load_bookings(date)
+        schedule = {"_id": date, "version": 1, "entries": [schedule_entry(b) for b in bookings]}
+        try:
+            await self._collection.insert_one(schedule)
+        except DuplicateKeyError:
+            # Seeded concurrently; use the stored one
+            return await self._collection.find_one({"_id": date})
+        return schedule
+
+    def fleet_day(self, schedule: dict) -> FleetDay:
+        """Intervals of a schedule document, built once per date and version.
+
+        Holds that run out leave the version alone, so query the result
+        with ``now``.
+        """
+        date, version = schedule["_id"], schedule["version"]
+        cached = self._fleet_days.get(date)
+        if cached is None or cached[0] != version:
+            cached = (version, FleetDay(schedule["entries"]))
+            self._fleet_days[date] = cached
+            if len(self._fleet_days) > self._max_cached_days:
+                self._fleet_days.popitem(last=False)
+        self._fleet_days.move_to_end(date)
+        return cached[1]
+
+    async def _swap(self, schedule: dict, entries: List[dict]) -> bool:
+        result = await self._collection.update_one(
+            {"_id": schedule["_id"], "version": schedule["version"]},
+            {"$set": {"entries": _sorted(entries)}, "$inc": {"version": 1}}
+        )
+        return result.modified_count == 1
+
+    async def _backoff(self, attempt: int) -> None:
+        self.retries += 1
+        await asyncio.sleep(random.uniform(0, 0.001 * 2 ** min(attempt, 6)))
+
+    async def reserve(
+        self, booking: dict, vehicles: List[str], now: datetime
+    ) -> str:
+        """Add a pending booking to its date on the best-fit free vehicle.
+
+        ``booking`` needs ``id``, ``date``, the minute fields and
+        ``hold_expires_at``. Returns the chosen vehicle id.
+        """
+        start, end = booking['start_minutes'], booking['end_minutes']
+        for attempt in range(self._max_attempts):
+            schedule = await self.get(booking['date'])
+            # Expired holds are pruned by every successful swap
+            live = live_entries(schedule["entries"], now)
+            entries = [e for e in live if e["id"] != booking['id']]
+            # A retried booking must not collide with its own earlier interval
+            day = FleetDay(entries) if len(entries) < len(live) else self.fleet_day(schedule)
+            vehicle_id = day.best_fit(start, end, vehicles, now=now)
+            if vehicle_id is None:
+                self.conflicts += 1
+                raise SlotTaken(booking['date'])
+            entry = schedule_entry({**booking, "vehicle_id": vehicle_id, "payment_status": "pending"})
+            if await self._swap(schedule, entries + [entry]):
+                return vehicle_id
+            await self._backoff(attempt)
+        raise ScheduleContention(booking['date'])
+
+    async def update(self, booking: dict) -> None:
+        """Record a booking's new status, dropping it when it stops blocking"""
+        for attempt in range(self._max_attempts):
+            schedule = await self.get(booking['date'])
+            entries = [e for e in schedule["entries"] if e["id"] != booking['id']]
+            if booking['payment_status'] in BLOCKING_STATUSES:
+                entries.append(schedule_entry(booking))
+            if await self._swap(schedule, entries):
+                return
+            await self._backoff(attempt)
+        raise ScheduleContention(booking['date'])
+
+    async def release(self, date: str, booking_ids: List[str]) -> None:
+        """Remove bookings from their date (cancelled, expired, failed inserts)"""
+        await self._collection.update_one(
+            {"_id": date},
+            {"$pull": {"entries": {"id": {"$in": booking_ids}}}, "$inc": {"version": 1}}
+        )
+
+    async def touch(self, date: str) -> None:
+        """Bump the version after a booking write that left the intervals alone"""
+        await self._collection.update_one({"_id": date}, {"$inc": {"version": 1}})
+
+    async def version(self, date: str) -> int:
+        """Current version of a date; 0 before anything was booked or checked"""
+        schedule = await self._collection.find_one({"_id": date}, {"version": 1})
+        return schedule["version"] if schedule else 0
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {"conflicts": self.conflicts, "retries": self.retries}
+
+
+# Booking fields a schedule entry is built from
+ENTRY_SOURCE_PROJECTION = {
+    "_id": 0, "id": 1, "date": 1, "vehicle_id": 1, "payment_status": 1, "hold_expires_at": 1,
+    "start_minutes": 1, "blocked_until_minutes": 1, "start_time": 1, "end_time": 1,
+}
+
+
+async def rebuild_schedules(
+    db,
+    now: datetime,
+    verify_only: bool = False,
+    batch_size: int = 1000,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Recompute the daily schedules from ``bookings`` in one streaming pass.
+
+    Bookings are read in date order, so only one date's entries are held in
+    memory. Dates whose stored entries differ are counted as mismatched and,
+    unless ``verify_only``, rewritten with a bumped version. ``from_date``
+    and ``to_date`` limit the pass to a range of dates.
+    """
+    stats = {"bookings": 0, "dates": 0, "mismatched": 0, "written": 0}
+    seen = set()
+    started = time.perf_counter()
+    dates: Dict[str, str] = {}
+    if from_date:
+        dates["$gte"] = from_date
+    if to_date:
+        dates["$lte"] = to_date
+
+    async def settle(date: str, entries: List[dict]) -> None:
+        stats["dates"] += 1
+        seen.add(date)
+        stored = await db.daily_schedules.find_one({"_id": date}, {"entries": 1})
+        stored_entries = live_entries(stored["entries"], now) if stored else []
+        if sorted(map(_entry_key, stored_entries)) == sorted(map(_entry_key, entries)):
+            return
+        stats["mismatched"] += 1
+        if not verify_only:
+            await db.daily_schedules.update_one(
+                {"_id": date},
+                {"$set": {"entries": _sorted(entries)}, "$inc": {"version": 1}},
+                upsert=True
+            )
+            stats["written"] += 1
+
+    query = {"payment_status": {"$in": list(BLOCKING_STATUSES)}, **live_hold_filter(now)}
+    if dates:
+        query["date"] = dates
+    cursor = db.bookings.find(
+        query,
+        ENTRY_SOURCE_PROJECTION,
+        batch_size=batch_size
+    ).sort("date", 1)
+    current, entries = None, []
+    async for booking in cursor:
+        stats["bookings"] += 1
+        if booking["date"] != current:
+            if current is not None:
+                await settle(current, entries)
+            current, entries = booking["date"], []
+        entries.append(schedule_entry(booking))
+    if current is not None:
+        await settle(current, entries)
+
+    # Schedules still listing intervals for dates without blocking bookings
+    stale_query: Dict[str, Any] = {"entries.0": {"$exists": True}}
+    if dates:
+        stale_query["_id"] = dates
+    stale = db.daily_schedules.find(stale_query, {"_id": 1})
+    async for schedule in stale:
+        if schedule["_id"] not in seen:
+            await settle(schedule["_id"], [])
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = elapsed
+    stats["bookings_per_second"] = stats["bookings"] / elapsed if elapsed else None
+    return stats
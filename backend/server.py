@@ -1,131 +1,181 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request
+import time
+
+# Import-to-ready latency is measured from here
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Query
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional, Dict
 import uuid
+import json
+import base64
+import binascii
+import hashlib
+import hmac
+import tempfile
+from collections import defaultdict
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
-from emergentintegrations.payments.stripe.checkout import (
-    StripeCheckout,
-    CheckoutSessionResponse,
-    CheckoutStatusResponse,
-    CheckoutSessionRequest
+from pymongo import ReturnDocument
+from availability import (
+    BLOCKING_STATUSES,
+    blocked_interval,
+    booking_minutes,
+    minutes_to_time,
+    time_to_minutes,
+    vehicle_of,
+)
+from indexes import ensure_indexes
+from models import (
+    Booking,
+    BookingCreate,
+    CheckoutRequest,
+    ContactCreate,
+    ContactSubmission,
+    Vehicle,
+    VehicleCreate,
+)
+from caching import PaymentStatusCache, SingleFlight
+from health import CachedPing
+from fleet import Fleet
+from free_slots import MINUTES_PER_DAY, date_range, free_windows
+from schedules import DailySchedules, ScheduleContention, SlotTaken, live_entries
+from rollups import ROLLUP_SOURCE_PROJECTION, DailyRollups, summarize, summarize_range
+from holds import HoldSweeper, live_hold_filter, utc_now
+from webhook_inbox import WebhookInbox
+from stripe_client import StripeClientRegistry
+from write_behind import BufferFull, BufferedWriter
+from metrics import MetricsMiddleware, MongoCommandTimer, Registry
+from profiling import ProfileStore, ProfilingMiddleware
+from responses import (
+    FastJSONResponse,
+    dumps,
+    model_response,
+    not_modified,
+    strong_etag,
+    trusted_response,
 )
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Prometheus metrics, served at /api/metrics
+metrics = Registry()
+request_latency = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and status",
+    ("method", "route", "status")
+)
+mongo_latency = metrics.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection",
+    ("collection", "command")
+)
+mongo_failures = metrics.counter(
+    "mongo_command_failures", "Failed MongoDB commands by collection",
+    ("collection", "command")
+)
+stripe_latency = metrics.histogram(
+    "stripe_call_duration_seconds", "Stripe API call latency by operation",
+    ("operation", "outcome")
+)
+startup_seconds = metrics.gauge(
+    "app_startup_seconds", "Seconds spent starting this worker, by phase",
+    ("phase",)
+)
+
+# MongoDB connection; Motor connects on first use, warm_up_database() at startup
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Connections kept open per worker, opened before the first request
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '5'))
+client = AsyncIOMotorClient(
+    mongo_url,
+    tz_aware=True,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    event_listeners=[MongoCommandTimer(
+        mongo_latency, mongo_failures,
+        ("bookings", "payment_transactions", "contact_submissions")
+    )]
+)
 db = client[os.environ['DB_NAME']]
 
-# Create the main app without a prefix
-app = FastAPI()
-
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 
-# Define Models
-class BookingCreate(BaseModel):
-    date: str
-    start_time: str
-    end_time: str
-    pickup_location: str
-    dropoff_location: str
-    full_name: str
-    email: EmailStr
-    phone: str
-    duration_hours: float
-    total_price: float
-    deposit_amount: float
-    special_requests: Optional[str] = None
-
-class Booking(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    date: str
-    start_time: str
-    end_time: str
-    pickup_location: str
-    dropoff_location: str
-    full_name: str
-    email: str
-    phone: str
-    duration_hours: float
-    total_price: float
-    deposit_amount: float
-    special_requests: Optional[str] = None
-    payment_status: str = "pending"
-    session_id: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-class ContactSubmission(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    email: EmailStr
-    phone: str
-    message: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-class ContactCreate(BaseModel):
-    name: str
-    email: EmailStr
-    phone: str
-    message: str
-
-class PaymentTransaction(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    session_id: str
-    booking_id: str
-    amount: float
-    currency: str = "usd"
-    payment_status: str = "pending"
-    metadata: Optional[Dict] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-class CheckoutRequest(BaseModel):
-    booking_id: str
-    origin_url: str
-
-
-# Utility function to parse time string to minutes
-def time_to_minutes(time_str: str) -> int:
-    """Convert time string like '09:00 AM' to minutes since midnight"""
-    time_part, period = time_str.rsplit(' ', 1)
-    hours, minutes = map(int, time_part.split(':'))
-    
-    if period == 'PM' and hours != 12:
-        hours += 12
-    elif period == 'AM' and hours == 12:
-        hours = 0
-    
-    return hours * 60 + minutes
-
-def minutes_to_time(minutes: int) -> str:
-    """Convert minutes since midnight to time string like '09:00 AM'"""
-    hours = minutes // 60
-    mins = minutes % 60
-    period = 'AM' if hours < 12 else 'PM'
-    
-    if hours == 0:
-        hours = 12
-    elif hours > 12:
-        hours -= 12
-    
-    return f"{hours:02d}:{mins:02d} {period}"
+_BOOKING_INDEX_PROJECTION = {
+    "_id": 0, "id": 1, "date": 1, "start_time": 1, "end_time": 1, "payment_status": 1,
+    "start_minutes": 1, "blocked_until_minutes": 1, "hold_expires_at": 1, "vehicle_id": 1
+}
+
+async def _load_blocking_bookings(date: str) -> List[dict]:
+    return await db.bookings.find(
+        {
+            "date": date,
+            "payment_status": {"$in": list(BLOCKING_STATUSES)},
+            **live_hold_filter(utc_now())
+        },
+        _BOOKING_INDEX_PROJECTION
+    ).to_list(None)
+
+# Active vehicles; bookings are assigned to one of them
+fleet = Fleet(
+    db.vehicles,
+    ttl_seconds=float(os.environ.get('FLEET_CACHE_TTL_SECONDS', '30'))
+)
+
+# Minutes an unpaid booking holds its slot before the sweeper expires it
+BOOKING_HOLD_MINUTES = int(os.environ.get('BOOKING_HOLD_MINUTES', '30'))
+
+# Versioned per-date schedules: the read model of every day's occupancy,
+# updated on each booking write and serializing overlapping reservations.
+# Their version is also the per-date ETag counter, shared by all workers.
+daily_schedules = DailySchedules(db.daily_schedules, _load_blocking_bookings)
+
+# Per-date revenue and utilization sums by payment status, moved on every
+# status change and read by /api/analytics
+daily_rollups = DailyRollups(db.daily_rollups)
+
+# Booking fields status changes need for the schedules and the rollups
+_BOOKING_CHANGE_PROJECTION = {**_BOOKING_INDEX_PROJECTION, **ROLLUP_SOURCE_PROJECTION}
+
+async def _release_bookings(bookings: List[dict]) -> None:
+    """Drop bookings that stopped blocking (expired, cancelled) from the schedules"""
+    by_date = defaultdict(list)
+    for booking in bookings:
+        by_date[booking['date']].append(booking['id'])
+    for date, booking_ids in by_date.items():
+        await daily_schedules.release(date, booking_ids)
+
+async def _expire_bookings(bookings: List[dict]) -> None:
+    await _release_bookings(bookings)
+    await daily_rollups.move_many(bookings, "pending", "expired")
+
+hold_sweeper = HoldSweeper(
+    db.bookings,
+    _expire_bookings,
+    _BOOKING_CHANGE_PROJECTION,
+    interval_seconds=float(os.environ.get('HOLD_SWEEP_INTERVAL_SECONDS', '60'))
+)
+
+
+# ADMIN_TOKEN turns on the staff endpoints (fleet changes, cancellations,
+# analytics) for callers sending X-Admin-Token: <token>; they are refused
+# without it, since booking ids are listed publicly and revenue is private
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def _require_admin_token(request: Request) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
 
 
 # Booking Routes
@@ -142,96 +192,541 @@ async def create_booking(booking_input: BookingCreate):
     booking_dict = booking_input.model_dump()
     booking_obj = Booking(**booking_dict)
     
-    # Convert to dict and serialize datetime to ISO string for MongoDB
+    # Timestamps are stored as BSON dates
     doc = booking_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    # Integer minutes let availability checks run as a range query
+    doc.update(booking_minutes(doc['start_time'], doc['end_time']))
+    # Unpaid bookings only hold the slot for a while
+    doc['hold_expires_at'] = utc_now() + timedelta(minutes=BOOKING_HOLD_MINUTES)
     
-    _ = await db.bookings.insert_one(doc)
-    return booking_obj
+    # Reserve the best-fit free vehicle; concurrent overlapping bookings fail here
+    vehicles = await fleet.vehicle_ids()
+    try:
+        vehicle_id = await daily_schedules.reserve(doc, vehicles, utc_now())
+    except SlotTaken:
+        raise HTTPException(status_code=409, detail="Time slot is no longer available")
+    except ScheduleContention:
+        raise HTTPException(status_code=503, detail="Too many bookings at once, please try again")
+    doc['vehicle_id'] = booking_obj.vehicle_id = vehicle_id
+    
+    try:
+        _ = await db.bookings.insert_one(doc)
+    except Exception:
+        await daily_schedules.release(doc['date'], [doc['id']])
+        raise
+    # The reservation bumped the version before the row existed; bump it past the insert
+    await daily_schedules.touch(doc['date'])
+    await daily_rollups.move(doc, None, "pending")
+    return model_response(Booking, booking_obj, status_code=201)
+
+# Only the public booking fields, so internal fields never reach responses
+_BOOKING_PROJECTION = {"_id": 0, **{field: 1 for field in Booking.model_fields}}
+
+# Largest page a single JSON response returns
+MAX_BOOKINGS_PAGE = 1000
+
+def _encode_cursor(booking: dict) -> str:
+    created_at = booking['created_at']
+    if isinstance(created_at, datetime):
+        position = [created_at.isoformat(), booking['id']]
+    else:
+        # Row not migrated to a BSON date yet
+        position = [created_at, booking['id'], "string"]
+    raw = json.dumps(position).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_cursor(cursor: str) -> dict:
+    """Keyset filter for rows after the cursor in (created_at, id) order"""
+    try:
+        created_at, booking_id, *legacy = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not legacy:
+            created_at = datetime.fromisoformat(created_at)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    after = [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "id": {"$gt": booking_id}}
+    ]
+    if legacy:
+        # Mongo sorts strings before dates, so every migrated row comes later
+        after.append({"created_at": {"$type": "date"}})
+    return {"$or": after}
 
 @api_router.get("/bookings", response_model=List[Booking])
-async def get_bookings(date: Optional[str] = None):
-    query = {}
+async def get_bookings(
+    request: Request,
+    date: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    format: Optional[str] = None
+):
+    """List bookings in (created_at, id) order.
+
+    JSON responses return at most ``limit`` (capped at 1000) rows and set
+    ``X-Next-Cursor`` when more rows follow. ``format=ndjson`` or an
+    ``Accept: application/x-ndjson`` header streams every row instead.
+    Single-date lists carry an ETag from the date's version; a matching
+    ``If-None-Match`` gets a 304 without reading bookings.
+    """
+    ndjson = format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", "")
+    headers = {}
+    if date:
+        # Version first: a write landing after this read only makes the body newer
+        version = await daily_schedules.version(date)
+        etag = strong_etag("bookings", date, version, limit, cursor, ndjson)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    conditions = []
     if date:
-        query['date'] = date
+        conditions.append({"date": date})
+    if cursor:
+        conditions.append(_decode_cursor(cursor))
+    query = {"$and": conditions} if conditions else {}
     
-    bookings = await db.bookings.find(query, {"_id": 0}).to_list(1000)
+    rows = db.bookings.find(query, _BOOKING_PROJECTION).sort([("created_at", 1), ("id", 1)])
     
-    # Convert ISO string timestamps back to datetime objects
-    for booking in bookings:
-        if isinstance(booking['created_at'], str):
-            booking['created_at'] = datetime.fromisoformat(booking['created_at'])
+    if ndjson:
+        if limit:
+            rows = rows.limit(limit)
+        
+        async def stream():
+            async for booking in rows:
+                yield dumps(booking) + b"\n"
+        
+        return StreamingResponse(stream(), media_type="application/x-ndjson", headers=headers)
+    
+    page_size = min(limit or MAX_BOOKINGS_PAGE, MAX_BOOKINGS_PAGE)
+    # One extra row tells whether another page exists
+    bookings = await rows.limit(page_size + 1).to_list(page_size + 1)
+    if len(bookings) > page_size:
+        bookings = bookings[:page_size]
+        headers["X-Next-Cursor"] = _encode_cursor(bookings[-1])
     
-    return bookings
+    # Rows are projected to the Booking fields, so they skip response validation
+    return trusted_response(bookings, headers=headers)
+
+@api_router.get("/bookings/holds")
+async def get_hold_sweeper_stats():
+    """Backlog and throughput of the expired hold sweeper"""
+    return await hold_sweeper.stats()
+
+@api_router.post("/bookings/{booking_id}/cancel", response_model=Booking)
+async def cancel_booking(booking_id: str, request: Request):
+    """Cancel an unpaid booking and free its slot; paid bookings are refunded by hand"""
+    _require_admin_token(request)
+    booking = await db.bookings.find_one_and_update(
+        {"id": booking_id, "payment_status": "pending"},
+        {"$set": {"payment_status": "cancelled"}},
+        projection={**_BOOKING_PROJECTION, **_BOOKING_INDEX_PROJECTION},
+        return_document=ReturnDocument.AFTER
+    )
+    if booking is None:
+        if await db.bookings.count_documents({"id": booking_id}, limit=1):
+            raise HTTPException(status_code=409, detail="Only unpaid bookings can be cancelled")
+        raise HTTPException(status_code=404, detail="Booking not found")
+    await _release_bookings([booking])
+    await daily_rollups.move(booking, "pending", "cancelled")
+    return booking
 
 @api_router.get("/bookings/check-availability")
-async def check_availability(date: str, start_time: str, end_time: str):
-    """Check if a time slot is available considering buffer time"""
-    bookings = await db.bookings.find(
-        {"date": date, "payment_status": {"$in": ["paid", "pending"]}},
-        {"_id": 0}
-    ).to_list(1000)
-    
+async def check_availability(request: Request, date: str, start_time: str, end_time: str):
+    """Check if a time slot is available considering buffer time.
+
+    Answered from one point lookup of the date's schedule; the ETag covers
+    its version, the live holds and the fleet, so a hold running out or a
+    new vehicle changes it too.
+    """
     requested_start = time_to_minutes(start_time)
     requested_end = time_to_minutes(end_time)
     
-    for booking in bookings:
-        booking_start = time_to_minutes(booking['start_time'])
-        booking_end = time_to_minutes(booking['end_time'])
-        # Add 1.5 hour (90 minutes) buffer after booking
-        booking_end_with_buffer = booking_end + 90
-        
-        # Check for overlap
-        if not (requested_end <= booking_start or requested_start >= booking_end_with_buffer):
-            return {
-                "available": False,
-                "message": f"Time slot conflicts with existing booking. Vehicle available after {minutes_to_time(booking_end_with_buffer)}"
+    vehicles = await fleet.vehicle_ids()
+    schedule = await daily_schedules.get(date)
+    now = utc_now()
+    entries = live_entries(schedule["entries"], now)
+    etag = strong_etag(
+        "availability", date, schedule["version"], sorted(e["id"] for e in entries),
+        vehicles, requested_start, requested_end
+    )
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    # Blocked intervals already include the 1.5 hour (90 minutes) buffer
+    conflict = daily_schedules.fleet_day(schedule).find_conflict(
+        requested_start, requested_end, vehicles, now=now
+    )
+    
+    if conflict is not None:
+        return FastJSONResponse({
+            "available": False,
+            "message": f"Time slot conflicts with existing booking. Vehicle available after {minutes_to_time(conflict.blocked_until)}"
+        }, headers=headers)
+    
+    return FastJSONResponse({"available": True, "message": "Time slot is available"}, headers=headers)
+
+
+# Longest range /api/availability answers in one call
+MAX_AVAILABILITY_DAYS = 92
+
+def _requested_dates(from_date: str, to_date: str, max_days: int) -> List[str]:
+    """Every date from ``from`` to ``to`` inclusive, or a 400"""
+    try:
+        first = datetime.strptime(from_date, "%Y-%m-%d").date()
+        last = datetime.strptime(to_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if last < first:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (last - first).days >= max_days:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {max_days} days")
+    return date_range(first, last)
+
+@api_router.get("/availability")
+async def get_availability(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    granularity: int = Query(15, ge=5, le=240)
+):
+    """Free time windows for every date in a range, read from the daily schedules"""
+    dates = _requested_dates(from_date, to_date, MAX_AVAILABILITY_DAYS)
+    vehicles = await fleet.vehicle_ids()
+    now = utc_now()
+    schedules = await db.daily_schedules.find(
+        {"_id": {"$gte": dates[0], "$lte": dates[-1]}}
+    ).to_list(None)
+    blocked = [
+        (s["_id"], e['vehicle_id'], e['start_minutes'], e['blocked_until_minutes'])
+        for s in schedules for e in live_entries(s["entries"], now)
+    ]
+    # Dates nobody has booked or checked yet have no schedule; read their bookings directly
+    unscheduled = set(dates).difference(s["_id"] for s in schedules)
+    if unscheduled:
+        bookings = await db.bookings.find(
+            {
+                "date": {"$in": sorted(unscheduled)},
+                "payment_status": {"$in": list(BLOCKING_STATUSES)},
+                **live_hold_filter(now)
+            },
+            _BOOKING_INDEX_PROJECTION
+        ).to_list(None)
+        blocked.extend((b['date'], vehicle_of(b), *blocked_interval(b)[:2]) for b in bookings)
+    
+    try:
+        windows = free_windows(dates, vehicles, blocked, granularity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "from": dates[0],
+        "to": dates[-1],
+        "granularity": granularity,
+        "days": [
+            {
+                "date": day,
+                "free": [
+                    {
+                        "start_time": minutes_to_time(start),
+                        "end_time": minutes_to_time(end % MINUTES_PER_DAY),
+                        "start_minutes": start,
+                        "end_minutes": end
+                    }
+                    for start, end in windows[day]
+                ]
             }
+            for day in dates
+        ]
+    }
+
+
+# Longest range /api/analytics answers in one call
+MAX_ANALYTICS_DAYS = 366
+
+@api_router.get("/analytics")
+async def get_analytics(
+    request: Request,
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to")
+):
+    """Revenue, deposits and utilization per date, read from the daily rollups.
+
+    One rollup document per date, never the bookings themselves.
+    Utilization is the share of the current fleet's day blocked by paid
+    and pending bookings, buffer included.
+    """
+    _require_admin_token(request)
+    dates = _requested_dates(from_date, to_date, MAX_ANALYTICS_DAYS)
+    vehicles = await fleet.vehicle_ids()
+    rollups = {r["_id"]: r for r in await daily_rollups.range(dates[0], dates[-1])}
+    days = [summarize(day, rollups.get(day), len(vehicles)) for day in dates]
+    return {
+        "from": dates[0],
+        "to": dates[-1],
+        "vehicles": len(vehicles),
+        "totals": summarize_range(days, len(vehicles)),
+        "days": days
+    }
+
+
+# Vehicle Routes
+@api_router.get("/vehicles", response_model=List[Vehicle])
+async def get_vehicles():
+    vehicles = await db.vehicles.find({}, {"_id": 0}).sort([("created_at", 1), ("id", 1)]).to_list(None)
+    return trusted_response(vehicles)
+
+@api_router.post("/vehicles", response_model=Vehicle, status_code=201)
+async def create_vehicle(vehicle_input: VehicleCreate, request: Request):
+    _require_admin_token(request)
+    vehicle_obj = Vehicle(**vehicle_input.model_dump())
+    
+    doc = vehicle_obj.model_dump()
     
-    return {"available": True, "message": "Time slot is available"}
+    _ = await db.vehicles.insert_one(doc)
+    fleet.invalidate()
+    return model_response(Vehicle, vehicle_obj, status_code=201)
 
 
 # Contact Routes
+
+# CONTACT_WRITE_BEHIND=1 batches contact inserts instead of one round trip per post
+contact_writer = None
+if os.environ.get('CONTACT_WRITE_BEHIND', '0') == '1':
+    contact_writer = BufferedWriter(
+        db.contact_submissions,
+        max_batch=int(os.environ.get('CONTACT_WRITE_BATCH', '100')),
+        flush_interval_seconds=float(os.environ.get('CONTACT_WRITE_INTERVAL_MS', '50')) / 1000,
+        queue_size=int(os.environ.get('CONTACT_WRITE_QUEUE_SIZE', '10000'))
+    )
+
 @api_router.post("/contact", response_model=ContactSubmission, status_code=201)
 async def create_contact(contact_input: ContactCreate):
     contact_dict = contact_input.model_dump()
     contact_obj = ContactSubmission(**contact_dict)
     
     doc = contact_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
-    _ = await db.contact_submissions.insert_one(doc)
-    return contact_obj
+    if contact_writer is None:
+        _ = await db.contact_submissions.insert_one(doc)
+    else:
+        try:
+            await contact_writer.submit(doc)
+        except BufferFull:
+            raise HTTPException(status_code=503, detail="Too many messages at once, please try again")
+    return model_response(ContactSubmission, contact_obj, status_code=201)
+
+@api_router.get("/contact/buffer")
+async def get_contact_buffer_stats():
+    """Queue depth, batch sizes and flush latency of the contact write buffer"""
+    if contact_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **contact_writer.stats()}
 
 
 # Payment Routes
+# Shared Stripe clients with a pooled HTTP session, opened on startup
+stripe_clients = StripeClientRegistry.from_env(
+    on_call=lambda operation, seconds, error: stripe_latency.observe(
+        seconds, operation, "error" if error else "ok"
+    )
+)
+
+# MONGO_USE_TRANSACTIONS=1 wraps both writes of a transition in a transaction
+# (needs a replica set); otherwise each write is an atomic conditional update
+USE_TRANSACTIONS = os.environ.get('MONGO_USE_TRANSACTIONS', '0') == '1'
+
+async def transition_payment(
+    session_id: str, payment_status: str, checkout_status: Optional[dict] = None
+) -> Optional[dict]:
+    """Move a checkout session's transaction and booking to payment_status.
+
+    Only the caller whose conditional update flips the transaction applies
+    the change, so webhook retries and status polls can race safely. A
+    transition costs two round trips and a repeated one costs one. Only a
+    pending booking still holding its slot is moved; a payment landing after
+    the hold ran out goes through ``_settle_late_payment``. Returns the
+    updated booking, or None when the transition had already happened.
+    """
+    txn_update = {
+        "payment_status": payment_status,
+        "updated_at": datetime.now(timezone.utc)
+    }
+    if checkout_status:
+        txn_update["checkout_status"] = checkout_status
+    
+    async def apply(session=None):
+        payment_txn = await db.payment_transactions.find_one_and_update(
+            {"session_id": session_id, "payment_status": {"$ne": payment_status}},
+            {"$set": txn_update},
+            projection={"_id": 0, "booking_id": 1},
+            session=session
+        )
+        if not payment_txn:
+            return None, None
+        booking_update = {"$set": {"payment_status": payment_status}}
+        if payment_status == "paid":
+            booking_update["$unset"] = {"hold_expires_at": ""}
+        # The status before the update tells the rollups where to move the booking from
+        previous = await db.bookings.find_one_and_update(
+            {"id": payment_txn["booking_id"], "payment_status": "pending", **live_hold_filter(utc_now())},
+            booking_update,
+            projection=_BOOKING_CHANGE_PROJECTION,
+            return_document=ReturnDocument.BEFORE,
+            session=session
+        )
+        return payment_txn, previous
+    
+    if USE_TRANSACTIONS:
+        async with await client.start_session() as session:
+            payment_txn, previous = await session.with_transaction(apply)
+    else:
+        payment_txn, previous = await apply()
+    
+    payment_status_cache.invalidate(session_id)
+    if not payment_txn:
+        return None
+    if not previous:
+        if payment_status == "paid":
+            return await _settle_late_payment(payment_txn["booking_id"])
+        return None
+    booking = {**previous, "payment_status": payment_status}
+    if payment_status == "paid":
+        booking.pop("hold_expires_at", None)
+    # A paid booking no longer expires in its date's schedule
+    await daily_schedules.update(booking)
+    await daily_rollups.move(booking, previous.get("payment_status"), payment_status)
+    return booking
+
+# A paid booking whose slot was taken after its hold ran out; it holds no
+# vehicle and needs a refund or a manual reassignment
+PAID_UNASSIGNED = "paid_unassigned"
+
+async def _settle_late_payment(booking_id: str) -> Optional[dict]:
+    """Record a payment for a booking whose hold ran out before it arrived.
+
+    Its slot may have gone to another booking since, so the slot is
+    reserved again first: the booking is paid on the vehicle it gets, or
+    marked ``paid_unassigned`` when none is free.
+    """
+    booking = await db.bookings.find_one({"id": booking_id}, _BOOKING_CHANGE_PROJECTION)
+    if not booking or booking['payment_status'] in ("paid", PAID_UNASSIGNED):
+        return None
+    from_status = booking['payment_status']
+    booking.update(booking_minutes(booking['start_time'], booking['end_time']))
+    
+    vehicles = await fleet.vehicle_ids()
+    hold = {**booking, "hold_expires_at": utc_now() + timedelta(minutes=BOOKING_HOLD_MINUTES)}
+    try:
+        vehicle_id = await daily_schedules.reserve(hold, vehicles, utc_now())
+    except (SlotTaken, ScheduleContention):
+        vehicle_id = None
+    
+    if vehicle_id is not None:
+        update = {"$set": {"payment_status": "paid", "vehicle_id": vehicle_id}, "$unset": {"hold_expires_at": ""}}
+    else:
+        update = {"$set": {"payment_status": PAID_UNASSIGNED}}
+    previous = await db.bookings.find_one_and_update(
+        {"id": booking_id, "payment_status": from_status},
+        update,
+        projection=_BOOKING_CHANGE_PROJECTION,
+        return_document=ReturnDocument.BEFORE
+    )
+    if not previous:
+        # Changed meanwhile; put its schedule entry back the way the row has it
+        current = await db.bookings.find_one({"id": booking_id}, _BOOKING_INDEX_PROJECTION)
+        if current:
+            await daily_schedules.update(current)
+        return None
+    
+    if vehicle_id is not None:
+        booking = {**previous, "payment_status": "paid", "vehicle_id": vehicle_id}
+        booking.pop("hold_expires_at", None)
+        await daily_schedules.update(booking)
+    else:
+        booking = {**previous, "payment_status": PAID_UNASSIGNED}
+        await _release_bookings([booking])
+        logger.warning(
+            "Booking %s was paid after its hold ran out and its slot is taken; refund or reassign it",
+            booking_id
+        )
+    await daily_rollups.move(booking, from_status, booking['payment_status'])
+    return booking
+
+# How long a created checkout session is handed out again. Stripe sessions
+# expire after 24 hours; stop reusing them a little before that. Sessions
+# are never reused past the booking's hold either.
+CHECKOUT_REUSE_SECONDS = int(os.environ.get('CHECKOUT_REUSE_SECONDS', str(23 * 3600)))
+
+# Concurrent checkout requests for one booking share a single session
+_checkout_flights = SingleFlight()
+
+async def _reusable_checkout(booking: dict, deposit_amount: float) -> Optional[dict]:
+    """The booking's open checkout session, if it can still be paid as is"""
+    if not booking.get('session_id'):
+        return None
+    if not booking.get('hold_expires_at') or booking['hold_expires_at'] <= utc_now():
+        return None
+    payment_txn = await db.payment_transactions.find_one(
+        {"session_id": booking['session_id'], "payment_status": "pending"},
+        {"_id": 0, "amount": 1, "url": 1, "expires_at": 1}
+    )
+    if (
+        payment_txn
+        and payment_txn.get('url')
+        and payment_txn['amount'] == deposit_amount
+        and payment_txn.get('expires_at')
+        and payment_txn['expires_at'] > datetime.now(timezone.utc)
+    ):
+        return {"url": payment_txn['url'], "session_id": booking['session_id']}
+    return None
+
 @api_router.post("/payments/checkout")
 async def create_checkout_session(checkout_req: CheckoutRequest, request: Request):
-    """Create Stripe checkout session for 50% deposit"""
+    """Create Stripe checkout session for 50% deposit, or reuse an open one"""
+    webhook_url = f"{str(request.base_url).rstrip('/')}/api/webhook/stripe"
+    result, _ = await _checkout_flights.do(
+        checkout_req.booking_id,
+        lambda: _open_checkout_session(checkout_req, webhook_url)
+    )
+    return result
+
+async def _open_checkout_session(checkout_req: CheckoutRequest, webhook_url: str) -> dict:
     # Get booking
     booking = await db.bookings.find_one({"id": checkout_req.booking_id}, {"_id": 0})
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     
     # Check if already paid
-    if booking.get('payment_status') == 'paid':
+    if booking.get('payment_status') in ('paid', PAID_UNASSIGNED):
         raise HTTPException(status_code=400, detail="Booking already paid")
     
-    # Initialize Stripe
-    stripe_api_key = os.environ.get('STRIPE_API_KEY')
-    if not stripe_api_key:
+    if booking.get('payment_status') == 'cancelled':
+        raise HTTPException(status_code=409, detail="Booking cancelled, please book again")
+    
+    # A hold past its expiry may have lost its slot, even before the sweeper runs
+    if booking.get('payment_status') == 'expired' or (
+        booking.get('hold_expires_at') and booking['hold_expires_at'] <= utc_now()
+    ):
+        raise HTTPException(status_code=409, detail="Booking hold expired, please book again")
+    
+    if not stripe_clients.configured:
         raise HTTPException(status_code=500, detail="Stripe API key not configured")
     
-    host_url = checkout_req.origin_url
-    webhook_url = f"{str(request.base_url).rstrip('/')}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url=webhook_url)
+    deposit_amount = float(booking['deposit_amount'])
+    
+    # Page reloads and double clicks get the session already opened
+    reusable = await _reusable_checkout(booking, deposit_amount)
+    if reusable:
+        return reusable
     
     # Create checkout session
-    deposit_amount = float(booking['deposit_amount'])
+    host_url = checkout_req.origin_url
     success_url = f"{host_url}/booking-success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = f"{host_url}/booking"
     
-    checkout_request = CheckoutSessionRequest(
+    checkout_request = stripe_clients.checkout_request(
         amount=deposit_amount,
         currency="usd",
         success_url=success_url,
@@ -248,9 +743,21 @@ async def create_checkout_session(checkout_req: CheckoutRequest, request: Reques
         }
     )
     
-    session: CheckoutSessionResponse = await stripe_checkout.create_checkout_session(checkout_request)
+    # Keep the slot while the customer pays; only a hold still live is extended
+    now = utc_now()
+    held = await db.bookings.find_one_and_update(
+        {"id": checkout_req.booking_id, "payment_status": "pending", **live_hold_filter(now)},
+        {"$max": {"hold_expires_at": now + timedelta(minutes=BOOKING_HOLD_MINUTES)}},
+        projection=_BOOKING_INDEX_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if not held:
+        raise HTTPException(status_code=409, detail="Booking hold expired, please book again")
+    await daily_schedules.update(held)
+    
+    session = await stripe_clients.create_checkout_session(webhook_url, checkout_request)
     
-    # Create payment transaction record
+    # Create payment transaction record; it is handed out again only while the hold lasts
     payment_doc = {
         "id": str(uuid.uuid4()),
         "session_id": session.session_id,
@@ -259,110 +766,125 @@ async def create_checkout_session(checkout_req: CheckoutRequest, request: Reques
         "currency": "usd",
         "payment_status": "pending",
         "metadata": checkout_request.metadata,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "url": session.url,
+        "expires_at": min(held['hold_expires_at'], now + timedelta(seconds=CHECKOUT_REUSE_SECONDS)),
+        "created_at": now,
+        "updated_at": now
     }
     await db.payment_transactions.insert_one(payment_doc)
     
-    # Update booking with session_id
     await db.bookings.update_one(
-        {"id": checkout_req.booking_id},
+        {"id": checkout_req.booking_id, "payment_status": "pending"},
         {"$set": {"session_id": session.session_id}}
     )
+    # session_id is listed with the booking, so its date's ETag moves too
+    await daily_schedules.touch(held['date'])
     
     return {"url": session.url, "session_id": session.session_id}
 
-@api_router.get("/payments/status/{session_id}")
-async def get_payment_status(session_id: str):
-    """Get payment status from Stripe"""
-    stripe_api_key = os.environ.get('STRIPE_API_KEY')
-    if not stripe_api_key:
+async def _fetch_checkout_status(session_id: str) -> dict:
+    """Ask Stripe for a session's status and record it when paid"""
+    if not stripe_clients.configured:
         raise HTTPException(status_code=500, detail="Stripe API key not configured")
     
-    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url="")
+    checkout_status = await stripe_clients.get_checkout_status(session_id)
+    status = {
+        "status": checkout_status.status,
+        "payment_status": checkout_status.payment_status,
+        "amount_total": checkout_status.amount_total,
+        "currency": checkout_status.currency
+    }
+    
+    if checkout_status.payment_status == "paid":
+        # Keep the status on the transaction for later polls
+        await transition_payment(session_id, "paid", checkout_status=status)
     
+    return status
+
+async def _load_paid_status(session_id: str) -> Optional[dict]:
+    """Status of a session already recorded as paid, without calling Stripe"""
+    payment_txn = await db.payment_transactions.find_one(
+        {"session_id": session_id, "payment_status": "paid"},
+        {"_id": 0, "amount": 1, "currency": 1, "checkout_status": 1}
+    )
+    if not payment_txn:
+        return None
+    if payment_txn.get("checkout_status"):
+        return payment_txn["checkout_status"]
+    # Paid through the webhook, which does not carry the full status
+    return {
+        "status": "complete",
+        "payment_status": "paid",
+        "amount_total": int(round(payment_txn["amount"] * 100)),
+        "currency": payment_txn.get("currency", "usd")
+    }
+
+payment_status_cache = PaymentStatusCache(
+    _fetch_checkout_status,
+    _load_paid_status,
+    ttl_seconds=float(os.environ.get('PAYMENT_STATUS_CACHE_TTL_SECONDS', '3'))
+)
+
+@api_router.get("/payments/status/{session_id}")
+async def get_payment_status(session_id: str):
+    """Get payment status from our records or Stripe"""
     try:
-        checkout_status: CheckoutStatusResponse = await stripe_checkout.get_checkout_status(session_id)
-        
-        # Update payment transaction if paid and not already updated
-        if checkout_status.payment_status == "paid":
-            payment_txn = await db.payment_transactions.find_one(
-                {"session_id": session_id, "payment_status": {"$ne": "paid"}},
-                {"_id": 0}
-            )
-            
-            if payment_txn:
-                # Update payment transaction
-                await db.payment_transactions.update_one(
-                    {"session_id": session_id},
-                    {
-                        "$set": {
-                            "payment_status": "paid",
-                            "updated_at": datetime.now(timezone.utc).isoformat()
-                        }
-                    }
-                )
-                
-                # Update booking
-                await db.bookings.update_one(
-                    {"session_id": session_id},
-                    {"$set": {"payment_status": "paid"}}
-                )
-        
-        return {
-            "status": checkout_status.status,
-            "payment_status": checkout_status.payment_status,
-            "amount_total": checkout_status.amount_total,
-            "currency": checkout_status.currency
-        }
+        return await payment_status_cache.get(session_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/payments/stripe-client")
+async def get_stripe_client_stats():
+    """Per-operation latency of outbound Stripe calls"""
+    return stripe_clients.stats()
+
+@api_router.get("/payments/status-cache")
+async def get_payment_status_cache_stats():
+    """Hit/miss counters of the payment status cache"""
+    return payment_status_cache.stats()
+
+async def _process_webhook_event(event: dict) -> None:
+    if event.get("payment_status") == "paid" and event.get("session_id"):
+        await transition_payment(event["session_id"], "paid")
+
+# Verified webhook events, recorded by a worker pool after the response
+webhook_inbox = WebhookInbox(
+    db.webhook_events,
+    _process_webhook_event,
+    workers=int(os.environ.get('WEBHOOK_WORKERS', '4')),
+    queue_size=int(os.environ.get('WEBHOOK_QUEUE_SIZE', '1000'))
+)
+
 @api_router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
-    """Handle Stripe webhooks"""
-    stripe_api_key = os.environ.get('STRIPE_API_KEY')
-    if not stripe_api_key:
+    """Verify a Stripe webhook and queue it for processing"""
+    if not stripe_clients.configured:
         raise HTTPException(status_code=500, detail="Stripe API key not configured")
     
     body = await request.body()
     signature = request.headers.get("Stripe-Signature")
     
-    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url="")
-    
     try:
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
-        
-        if webhook_response.payment_status == "paid":
-            session_id = webhook_response.session_id
-            
-            # Check if already processed
-            payment_txn = await db.payment_transactions.find_one(
-                {"session_id": session_id, "payment_status": {"$ne": "paid"}},
-                {"_id": 0}
-            )
-            
-            if payment_txn:
-                # Update payment transaction
-                await db.payment_transactions.update_one(
-                    {"session_id": session_id},
-                    {
-                        "$set": {
-                            "payment_status": "paid",
-                            "updated_at": datetime.now(timezone.utc).isoformat()
-                        }
-                    }
-                )
-                
-                # Update booking
-                await db.bookings.update_one(
-                    {"session_id": session_id},
-                    {"$set": {"payment_status": "paid"}}
-                )
-        
-        return {"status": "success"}
+        webhook_response = await stripe_clients.handle_webhook(body, signature)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    
+    # Stripe retries reuse the event id, so duplicates are dropped here
+    event_id = getattr(webhook_response, "event_id", None) or hashlib.sha256(body).hexdigest()
+    await webhook_inbox.submit(event_id, {
+        "event_type": webhook_response.event_type,
+        "session_id": webhook_response.session_id,
+        "payment_status": webhook_response.payment_status,
+        "metadata": getattr(webhook_response, "metadata", None)
+    })
+    return {"status": "success"}
+
+@api_router.get("/webhook/stripe/inbox")
+async def get_webhook_inbox_stats():
+    """Queue depth and processing lag of the webhook inbox"""
+    return await webhook_inbox.stats()
 
 
 # Root route
@@ -370,16 +892,134 @@ async def stripe_webhook(request: Request):
 async def root():
     return {"message": "Atlanta Luxury Chauffeur Service API"}
 
+# Readiness: set once startup finished, cleared as soon as shutdown begins
+startup_state: Dict[str, object] = {"ready": False}
+
+# /api/readyz pings MongoDB at most once per HEALTH_PING_TTL_SECONDS per worker
+mongo_health = CachedPing(
+    lambda: client.admin.command("ping"),
+    ttl_seconds=float(os.environ.get('HEALTH_PING_TTL_SECONDS', '2')),
+    timeout_seconds=float(os.environ.get('HEALTH_PING_TIMEOUT_SECONDS', '1'))
+)
+
+@api_router.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the worker serves requests; touches no dependency"""
+    return {"status": "ok", "uptime_seconds": time.perf_counter() - IMPORT_STARTED}
+
+@api_router.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: startup finished and MongoDB answered a (cached) ping"""
+    mongo = await mongo_health.check()
+    ready = startup_state["ready"] and mongo["ok"]
+    return FastJSONResponse(
+        {"ready": ready, "mongo": mongo, "startup": startup_state},
+        status_code=200 if ready else 503
+    )
+
+@api_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request, MongoDB and Stripe latency in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# PROFILING_TOKEN turns on request profiling: requests sent with
+# X-Profile-Token: <token> run under cProfile, PROFILE_SAMPLE_RATE profiles
+# that fraction of all traffic, and captures are listed and downloaded below
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+PROFILES_PREFIX = "/api/admin/profiles"
+profile_store = ProfileStore(
+    Path(os.environ.get('PROFILE_DIR', Path(tempfile.gettempdir()) / 'booking-profiles')),
+    max_profiles=int(os.environ.get('PROFILE_MAX_CAPTURES', '50'))
+)
+
+def _require_profiling_token(request: Request) -> None:
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("x-profile-token", "")
+    if not hmac.compare_digest(supplied.encode(), PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@api_router.get(PROFILES_PREFIX[len("/api"):], include_in_schema=False)
+async def list_profiles(request: Request):
+    """Stored request profiles, newest first"""
+    _require_profiling_token(request)
+    return await asyncio.to_thread(profile_store.list)
+
+@api_router.get(PROFILES_PREFIX[len("/api"):] + "/{name}", include_in_schema=False)
+async def download_profile(name: str, request: Request):
+    """A pstats file; open it with ``python -m pstats`` or snakeviz"""
+    _require_profiling_token(request)
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{name}.prof")
+
+
+async def warm_up_database():
+    """Open the pool, check indexes and seed the fleet before taking traffic"""
+    await client.admin.command("ping")
+    # One ping per pooled connection, concurrently, so each opens its own
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(MONGO_MIN_POOL_SIZE)))
+    # MONGO_INDEX_STRICT=1 refuses to start when indexes drifted from indexes.py
+    strict = os.environ.get('MONGO_INDEX_STRICT', '0') == '1'
+    await ensure_indexes(db, strict=strict)
+    await fleet.ensure_default()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await warm_up_database()
+    await webhook_inbox.start()
+    hold_sweeper.start()
+    if contact_writer is not None:
+        contact_writer.start()
+    ready_at = time.perf_counter()
+    startup_state.update(
+        ready=True,
+        import_seconds=started - IMPORT_STARTED,
+        warm_up_seconds=ready_at - started,
+        import_to_ready_seconds=ready_at - IMPORT_STARTED
+    )
+    for phase in ("import", "warm_up", "import_to_ready"):
+        startup_seconds.set(startup_state[f"{phase}_seconds"], phase)
+    logger.info("Ready %.3fs after import (warm-up %.3fs)", ready_at - IMPORT_STARTED, ready_at - started)
+    
+    yield
+    
+    startup_state["ready"] = False
+    # Buffered contact submissions are written before the client goes away
+    if contact_writer is not None:
+        await contact_writer.stop()
+    await hold_sweeper.stop()
+    await webhook_inbox.stop()
+    await stripe_clients.close()
+    client.close()
+
+# Create the main app without a prefix
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+if PROFILING_TOKEN:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        token=PROFILING_TOKEN,
+        sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+        skip_prefixes=(PROFILES_PREFIX,)
+    )
+
+app.add_middleware(MetricsMiddleware, histogram=request_latency)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -389,6 +1029,3 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
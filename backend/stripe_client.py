@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+class StripeNotConfigured(RuntimeError):
+    pass
+
+
+class StripeClientRegistry:
+    """Process-wide Stripe checkout clients sharing one pooled HTTP session.
+
+    The first client created (or an explicit ``start``) installs a
+    keep-alive connection pool as the Stripe library's HTTP client, so
+    importing and starting the server never loads the Stripe libraries;
+    ``close`` releases the pool. Clients are created once per webhook URL
+    and reused; the URL comes from the request's Host header, so only the
+    ``max_clients`` most recently used are kept. Every call goes through a
+    concurrency limit and a timeout, and its latency is recorded per
+    operation and passed to ``on_call(operation, seconds, error)`` when
+    given.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        max_concurrency: int = 20,
+        timeout_seconds: float = 15.0,
+        pool_size: int = 20,
+        api_base: Optional[str] = None,
+        on_call: Optional[Callable[[str, float, bool], None]] = None,
+        max_clients: int = 4,
+    ):
+        self._api_key = api_key
+        self._timeout = timeout_seconds
+        self._pool_size = pool_size
+        self._api_base = api_base
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._clients: "OrderedDict[str, Any]" = OrderedDict()
+        self._max_clients = max_clients
+        self._http_session = None
+        self._installed = False
+        self._on_call = on_call
+        self.latency: Dict[str, LatencyStats] = {}
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "StripeClientRegistry":
+        return cls(
+            api_key=os.environ.get('STRIPE_API_KEY'),
+            max_concurrency=int(os.environ.get('STRIPE_MAX_CONCURRENCY', '20')),
+            timeout_seconds=float(os.environ.get('STRIPE_TIMEOUT_SECONDS', '15')),
+            pool_size=int(os.environ.get('STRIPE_POOL_SIZE', '20')),
+            api_base=os.environ.get('STRIPE_API_BASE'),
+            **kwargs,
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self._api_key)
+
+    async def start(self) -> None:
+        self._install_http_client()
+
+    def _install_http_client(self) -> None:
+        if self._installed:
+            return
+        self._installed = True
+        import requests
+
+        try:
+            import stripe
+        except ImportError:
+            logger.warning("stripe library not installed, Stripe calls will not be pooled")
+            return
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self._pool_size
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        stripe.default_http_client = stripe.RequestsClient(timeout=self._timeout, session=session)
+        if self._api_base:
+            stripe.api_base = self._api_base
+        self._http_session = session
+
+    async def close(self) -> None:
+        if self._http_session is not None:
+            self._http_session.close()
+            self._http_session = None
+        self._installed = False
+        self._clients.clear()
+
+    def checkout(self, webhook_url: str = ""):
+        if not self._api_key:
+            raise StripeNotConfigured("Stripe API key not configured")
+        client = self._clients.get(webhook_url)
+        if client is None:
+            self._install_http_client()
+            from emergentintegrations.payments.stripe.checkout import StripeCheckout
+
+            client = StripeCheckout(api_key=self._api_key, webhook_url=webhook_url)
+            self._clients[webhook_url] = client
+            while len(self._clients) > self._max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(webhook_url)
+        return client
+
+    @staticmethod
+    def checkout_request(**fields):
+        from emergentintegrations.payments.stripe.checkout import CheckoutSessionRequest
+
+        return CheckoutSessionRequest(**fields)
+
+    async def _call(self, operation: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        stats = self.latency.setdefault(operation, LatencyStats())
+        async with self._semaphore:
+            started = time.perf_counter()
+            error = True
+            try:
+                result = await asyncio.wait_for(call(), self._timeout)
+                error = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                stats.record(elapsed, error=error)
+                if self._on_call is not None:
+                    self._on_call(operation, elapsed, error)
+
+    async def create_checkout_session(self, webhook_url: str, request):
+        client = self.checkout(webhook_url)
+        return await self._call(
+            "create_checkout_session", lambda: client.create_checkout_session(request)
+        )
+
+    async def get_checkout_status(self, session_id: str):
+        client = self.checkout()
+        return await self._call(
+            "get_checkout_status", lambda: client.get_checkout_status(session_id)
+        )
+
+    async def handle_webhook(self, body: bytes, signature: Optional[str]):
+        client = self.checkout()
+        return await self._call(
+            "handle_webhook", lambda: client.handle_webhook(body, signature)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {operation: stats.snapshot() for operation, stats in self.latency.items()}
@@ -0,0 +1,403 @@
+"""Bulk export and import of collections, run as ``python transfer.py <command>``.
+
+    python transfer.py export bookings bookings.ndjson.gz
+    python transfer.py export contact_submissions contacts.csv
+    python transfer.py import bookings bookings.ndjson.gz --concurrency 8
+
+Exports stream the cursor straight to the file, so memory stays flat at any
+size; a ``.gz`` suffix (or ``--gzip``) compresses. NDJSON keeps every field
+and is the format for backups; CSV holds the model fields and the internal
+fields listed in ``EXTRA_FIELDS`` for spreadsheets.
+
+Imports validate each row with the API's Pydantic model, keep the internal
+fields the model does not declare, and write unordered ``insert_many``
+batches with up to ``--concurrency`` in flight. Progress is checkpointed
+next to the input after every batch up to which everything is written, so
+an interrupted import resumes there. Rows already present are counted as
+duplicates, since ``id`` is unique in every collection that can be moved.
+Bookings exported before the minute fields existed get them computed
+from their times.
+
+Bookings inserted directly bypass the daily schedules and rollups, so a
+bookings import finishes by rebuilding both for the dates it covered
+(``--no-rebuild`` skips that; run the ``migrations.py`` rebuilds later).
+"""
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import orjson
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from availability import booking_minutes
+from holds import utc_now
+from models import Booking, ContactSubmission, PaymentTransaction
+from responses import dumps
+from rollups import BookingMinutesMissing, rebuild_rollups
+from schedules import rebuild_schedules
+
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+app = typer.Typer(help="Bulk export and import of the chauffeur booking database")
+
+# Collections that can be moved, by the API model validating their rows
+MODELS = {
+    "bookings": Booking,
+    "payment_transactions": PaymentTransaction,
+    "contact_submissions": ContactSubmission,
+}
+
+# Stored fields outside the API model, kept by CSV exports
+EXTRA_FIELDS = {
+    "bookings": ("start_minutes", "end_minutes", "blocked_until_minutes", "hold_expires_at"),
+    "payment_transactions": ("url", "expires_at", "checkout_status"),
+    "contact_submissions": (),
+}
+
+# Timestamps outside the API model, parsed back into BSON dates on import
+EXTRA_DATETIME_FIELDS = {
+    "bookings": {"hold_expires_at"},
+    "payment_transactions": {"expires_at"},
+    "contact_submissions": set(),
+}
+
+# Nested fields, JSON encoded inside CSV cells
+JSON_FIELDS = {"metadata", "checkout_status"}
+
+
+def _database():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    return client, client[os.environ['DB_NAME']]
+
+
+def _check_collection(collection: str) -> str:
+    if collection not in MODELS:
+        raise typer.BadParameter(f"one of {', '.join(MODELS)}", param_hint="COLLECTION")
+    return collection
+
+
+def _format(path: Path, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    suffixes = [s for s in path.suffixes if s != ".gz"]
+    return "csv" if suffixes and suffixes[-1] == ".csv" else "ndjson"
+
+
+def _open(path: Path, mode: str, compress: bool):
+    if compress:
+        return gzip.open(path, mode + "b", compresslevel=6)
+    return open(path, mode + "b")
+
+
+def csv_columns(collection: str) -> List[str]:
+    return [*MODELS[collection].model_fields, *EXTRA_FIELDS[collection]]
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+async def export_collection(
+    db, collection: str, out, fmt: str = "ndjson", batch_size: int = 1000
+) -> int:
+    """Stream every document of ``collection`` to the binary file ``out``"""
+    cursor = db[collection].find({}, {"_id": 0}, batch_size=batch_size)
+    written = 0
+    if fmt == "csv":
+        text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+        writer = csv.DictWriter(text, csv_columns(collection), extrasaction="ignore")
+        writer.writeheader()
+        async for doc in cursor:
+            writer.writerow({k: _csv_cell(v) for k, v in doc.items()})
+            written += 1
+        text.flush()
+        text.detach()
+    else:
+        async for doc in cursor:
+            out.write(dumps(doc) + b"\n")
+            written += 1
+    return written
+
+
+def read_rows(source, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Rows of an export; CSV cells come back as strings, empty ones dropped"""
+    if fmt == "csv":
+        for row in csv.DictReader(io.TextIOWrapper(source, encoding="utf-8", newline="")):
+            doc = {k: v for k, v in row.items() if v != ""}
+            for field in JSON_FIELDS & doc.keys():
+                doc[field] = json.loads(doc[field])
+            yield doc
+    else:
+        for line in source:
+            if line.strip():
+                yield orjson.loads(line)
+
+
+def to_document(collection: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Validated document: model fields coerced, internal fields kept"""
+    doc = {**row, **MODELS[collection].model_validate(row).model_dump()}
+    doc.pop("_id", None)
+    for field in EXTRA_DATETIME_FIELDS[collection] & doc.keys():
+        if isinstance(doc[field], str):
+            doc[field] = datetime.fromisoformat(doc[field])
+    for field in ("start_minutes", "end_minutes", "blocked_until_minutes"):
+        if isinstance(doc.get(field), str):
+            doc[field] = int(doc[field])
+    if collection == "bookings":
+        for field, minutes in booking_minutes(doc["start_time"], doc["end_time"]).items():
+            doc.setdefault(field, minutes)
+    return doc
+
+
+class DateRange:
+    """First and last ``date`` of the rows passing through ``track``"""
+
+    def __init__(self):
+        self.first: Optional[str] = None
+        self.last: Optional[str] = None
+
+    def track(self, rows: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for row in rows:
+            date = row.get("date")
+            if isinstance(date, str) and date:
+                if self.first is None or date < self.first:
+                    self.first = date
+                if self.last is None or date > self.last:
+                    self.last = date
+            yield row
+
+
+class Checkpoint:
+    """Rows up to which an import is written, kept in a JSON file.
+
+    Batches finish out of order, so the checkpoint only moves past a batch
+    once every batch before it has finished too.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.state = {"rows": 0, "inserted": 0, "duplicates": 0, "invalid": 0}
+        self._done: Dict[int, Tuple[int, Dict[str, int]]] = {}
+
+    def load(self) -> int:
+        if self.path.exists():
+            self.state.update(json.loads(self.path.read_text()))
+        return self.state["rows"]
+
+    def finish(self, first_row: int, last_row: int, counts: Dict[str, int]) -> None:
+        self._done[first_row] = (last_row, counts)
+        moved = False
+        while self.state["rows"] in self._done:
+            last_row, counts = self._done.pop(self.state["rows"])
+            for key, value in counts.items():
+                self.state[key] += value
+            self.state["rows"] = last_row
+            moved = True
+        if moved:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.state))
+            tmp.replace(self.path)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+async def _insert_batch(collection, docs: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """(inserted, duplicates) of one unordered batch"""
+    if not docs:
+        return 0, 0
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids), 0
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        other = [e for e in errors if e.get("code") != 11000]
+        if other:
+            raise
+        return exc.details.get("nInserted", 0), len(errors)
+
+
+async def import_rows(
+    db,
+    collection: str,
+    rows: Iterator[Dict[str, Any]],
+    checkpoint: Checkpoint,
+    batch_size: int = 1000,
+    concurrency: int = 4,
+    rejects=None,
+    on_progress=None,
+) -> Dict[str, int]:
+    """Validate and insert ``rows``, skipping those the checkpoint covers"""
+    target = db[collection]
+    skip = checkpoint.load()
+    in_flight: Set[asyncio.Task] = set()
+
+    async def write(first_row: int, last_row: int, docs, invalid: int) -> None:
+        inserted, duplicates = await _insert_batch(target, docs)
+        checkpoint.finish(first_row, last_row, {
+            "inserted": inserted, "duplicates": duplicates, "invalid": invalid
+        })
+        if on_progress is not None:
+            on_progress(checkpoint.state)
+
+    async def submit(first_row: int, last_row: int, docs, invalid: int) -> None:
+        while len(in_flight) >= concurrency:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.difference_update(done)
+            for task in done:
+                task.result()
+        task = asyncio.ensure_future(write(first_row, last_row, docs, invalid))
+        in_flight.add(task)
+
+    docs: List[Dict[str, Any]] = []
+    invalid = 0
+    first_row = row_number = skip
+    try:
+        for row_number, row in enumerate(rows, start=1):
+            if row_number <= skip:
+                continue
+            try:
+                docs.append(to_document(collection, row))
+            except (ValidationError, ValueError) as exc:
+                invalid += 1
+                if rejects is not None:
+                    rejects.write(dumps({"row": row_number, "error": str(exc), "data": row}) + b"\n")
+            if row_number - first_row >= batch_size:
+                await submit(first_row, row_number, docs, invalid)
+                docs, invalid, first_row = [], 0, row_number
+        if row_number > first_row:
+            await submit(first_row, row_number, docs, invalid)
+    finally:
+        if in_flight:
+            await asyncio.gather(*in_flight)
+    return checkpoint.state
+
+
+@app.command("export")
+def export_command(
+    collection: str = typer.Argument(..., callback=_check_collection),
+    path: Path = typer.Argument(..., help="Output file; a .gz suffix compresses."),
+    fmt: Optional[str] = typer.Option(None, "--format", help="ndjson or csv; default from the suffix."),
+    compress: bool = typer.Option(False, "--gzip", help="Compress even without a .gz suffix."),
+    batch_size: int = typer.Option(1000, min=1),
+):
+    """Stream a collection to NDJSON or CSV."""
+    fmt = _format(path, fmt)
+
+    async def run():
+        client, db = _database()
+        try:
+            with _open(path, "w", compress or path.suffix == ".gz") as out:
+                started = time.perf_counter()
+                written = await export_collection(db, collection, out, fmt, batch_size)
+                elapsed = time.perf_counter() - started
+        finally:
+            client.close()
+        typer.echo(
+            f"{collection}: exported {written} documents to {path} in {elapsed:.2f}s "
+            f"({written / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+
+    asyncio.run(run())
+
+
+@app.command("import")
+def import_command(
+    collection: str = typer.Argument(..., callback=_check_collection),
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="File written by export."),
+    fmt: Optional[str] = typer.Option(None, "--format", help="ndjson or csv; default from the suffix."),
+    batch_size: int = typer.Option(1000, min=1),
+    concurrency: int = typer.Option(4, min=1, help="insert_many batches in flight."),
+    restart: bool = typer.Option(False, "--restart", help="Ignore an existing checkpoint."),
+    rejects_path: Optional[Path] = typer.Option(None, "--rejects", help="NDJSON file for rows failing validation."),
+    rebuild: bool = typer.Option(
+        True, "--rebuild/--no-rebuild", help="Rebuild schedules and rollups of imported booking dates."
+    ),
+):
+    """Validate rows with the API models and insert them in parallel batches."""
+    fmt = _format(path, fmt)
+    checkpoint = Checkpoint(path.with_name(path.name + ".checkpoint"))
+    if restart:
+        checkpoint.remove()
+    reported = [time.perf_counter()]
+
+    def progress(state):
+        now = time.perf_counter()
+        if now - reported[0] >= 5:
+            reported[0] = now
+            typer.echo(f"  {state['rows']} rows, {state['inserted']} inserted", err=True)
+
+    async def run():
+        client, db = _database()
+        rejects = open(rejects_path, "ab") if rejects_path else None
+        # Rows skipped on resume count too: the run that wrote them never rebuilt
+        dates = DateRange()
+        try:
+            with _open(path, "r", path.suffix == ".gz") as source:
+                started = time.perf_counter()
+                resumed_at = checkpoint.load()
+                state = await import_rows(
+                    db, collection, dates.track(read_rows(source, fmt)), checkpoint,
+                    batch_size=batch_size, concurrency=concurrency,
+                    rejects=rejects, on_progress=progress,
+                )
+                elapsed = time.perf_counter() - started
+            checkpoint.remove()
+            rows = state["rows"] - resumed_at
+            typer.echo(
+                f"{collection}: {state['inserted']} inserted, {state['duplicates']} already present, "
+                f"{state['invalid']} invalid; {rows} rows in {elapsed:.2f}s "
+                f"({rows / elapsed if elapsed else 0:.0f} rows/s)"
+                + (f", resumed after row {resumed_at}" if resumed_at else "")
+            )
+            if collection == "bookings" and dates.first is not None:
+                if rebuild:
+                    schedules = await rebuild_schedules(
+                        db, utc_now(), from_date=dates.first, to_date=dates.last
+                    )
+                    typer.echo(
+                        f"rebuilt {schedules['written']} daily schedules of {dates.first} to {dates.last}"
+                    )
+                    try:
+                        rollups = await rebuild_rollups(db, dates.first, dates.last)
+                    except BookingMinutesMissing as exc:
+                        typer.echo(f"daily_rollups not rebuilt: {exc}, then daily-rollups", err=True)
+                        raise typer.Exit(code=1)
+                    typer.echo(f"rebuilt {rollups['dates']} daily rollups of {dates.first} to {dates.last}")
+                else:
+                    typer.echo(
+                        f"daily schedules and rollups of {dates.first} to {dates.last} are stale; run "
+                        f"migrations.py daily-schedules and daily-rollups --from {dates.first} --to {dates.last}",
+                        err=True,
+                    )
+        finally:
+            client.close()
+            if rejects is not None:
+                rejects.close()
+        if state["invalid"]:
+            raise typer.Exit(code=1)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class WebhookInbox:
+    """Durable inbox of verified webhook events drained by a worker pool.
+
+    ``submit`` stores an event under its event id and returns at once; a
+    repeated delivery of the same id is dropped. Workers claim each event
+    with a conditional update before calling ``handler``, so an event is
+    handled by one worker only, even across processes. Events that did not
+    fit the in-memory queue, or whose worker died, are picked up again by a
+    periodic sweep of the collection.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        workers: int = 4,
+        queue_size: int = 1000,
+        max_attempts: int = 5,
+        sweep_interval_seconds: float = 30.0,
+        stale_after_seconds: float = 300.0,
+        clock: Callable[[], datetime] = _utc_now,
+    ):
+        self._collection = collection
+        self._handler = handler
+        self._workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._max_attempts = max_attempts
+        self._sweep_interval = sweep_interval_seconds
+        self._stale_after = timedelta(seconds=stale_after_seconds)
+        self._clock = clock
+        self._tasks: List[asyncio.Task] = []
+        self.received = 0
+        self.duplicates = 0
+        self.processed = 0
+        self.failed = 0
+        self.in_progress = 0
+        self.last_lag_seconds: Optional[float] = None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self._workers)]
+        self._tasks.append(loop.create_task(self._sweep_forever()))
+
+    async def stop(self) -> None:
+        """Stop the pool; unfinished events stay in the inbox for the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, event_id: str, event: Dict[str, Any]) -> bool:
+        """Persist an event; returns False for an already received event id"""
+        doc = {
+            **event,
+            "_id": event_id,
+            "status": "pending",
+            "attempts": 0,
+            "received_at": self._clock(),
+        }
+        try:
+            await self._collection.insert_one(doc)
+        except DuplicateKeyError:
+            self.duplicates += 1
+            return False
+        self.received += 1
+        try:
+            self._queue.put_nowait(event_id)
+        except asyncio.QueueFull:
+            logger.warning("Webhook queue full, event %s waits for the next sweep", event_id)
+        return True
+
+    async def sweep(self) -> int:
+        """Release stale claims and queue pending events; returns events queued"""
+        await self._collection.update_many(
+            {"status": "processing", "claimed_at": {"$lt": self._clock() - self._stale_after}},
+            {"$set": {"status": "pending"}}
+        )
+        free = self._queue.maxsize - self._queue.qsize()
+        if free <= 0:
+            return 0
+        cursor = self._collection.find(
+            {"status": "pending"}, {"_id": 1}
+        ).sort("received_at", 1).limit(free)
+        queued = 0
+        async for event in cursor:
+            try:
+                self._queue.put_nowait(event["_id"])
+            except asyncio.QueueFull:
+                break
+            queued += 1
+        return queued
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Webhook inbox sweep failed")
+            await asyncio.sleep(self._sweep_interval)
+
+    async def _worker(self) -> None:
+        while True:
+            event_id = await self._queue.get()
+            try:
+                await self._process(event_id)
+            except Exception:
+                logger.exception("Webhook event %s could not be recorded", event_id)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, event_id: str) -> None:
+        event = await self._collection.find_one_and_update(
+            {"_id": event_id, "status": "pending"},
+            {"$set": {"status": "processing", "claimed_at": self._clock()}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if event is None:
+            # Already handled, or claimed by another worker
+            return
+
+        self.in_progress += 1
+        try:
+            await self._handler(event)
+        except Exception as exc:
+            status = "failed" if event["attempts"] >= self._max_attempts else "pending"
+            if status == "failed":
+                self.failed += 1
+            logger.warning("Webhook event %s attempt %s failed: %s", event_id, event["attempts"], exc)
+            await self._collection.update_one(
+                {"_id": event_id}, {"$set": {"status": status, "error": str(exc)}}
+            )
+            return
+        finally:
+            self.in_progress -= 1
+
+        processed_at = self._clock()
+        await self._collection.update_one(
+            {"_id": event_id}, {"$set": {"status": "done", "processed_at": processed_at}}
+        )
+        self.processed += 1
+        self.last_lag_seconds = (processed_at - _as_utc(event["received_at"])).total_seconds()
+
+    async def stats(self) -> Dict[str, Any]:
+        """Queue depth and lag, in memory and across the durable inbox"""
+        backlog = await self._collection.count_documents({"status": {"$in": ["pending", "processing"]}})
+        oldest = await self._collection.find_one(
+            {"status": "pending"}, {"received_at": 1}, sort=[("received_at", 1)]
+        )
+        oldest_lag = None
+        if oldest:
+            oldest_lag = (self._clock() - _as_utc(oldest["received_at"])).total_seconds()
+        return {
+            "queue_depth": self._queue.qsize(),
+            "in_progress": self.in_progress,
+            "backlog": backlog,
+            "oldest_pending_lag_seconds": oldest_lag,
+            "last_lag_seconds": self.last_lag_seconds,
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+# Queued by stop(); everything ahead of it is flushed first
+_STOP = object()
+
+
+class BufferFull(Exception):
+    """The write buffer stayed full for longer than the caller may wait"""
+
+
+class BufferedWriter:
+    """Write-behind buffer that batches inserts into one collection.
+
+    ``submit`` queues a document and returns once it is buffered; a single
+    flusher writes the queue with ``insert_many`` whenever ``max_batch``
+    documents are waiting or the oldest has waited ``flush_interval_seconds``.
+    When the bounded queue is full, ``submit`` waits for room and raises
+    ``BufferFull`` after ``put_timeout_seconds``. ``stop`` writes everything
+    still buffered before returning.
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_batch: int = 100,
+        flush_interval_seconds: float = 0.05,
+        queue_size: int = 10000,
+        put_timeout_seconds: float = 5.0,
+        max_attempts: int = 3,
+    ):
+        self._collection = collection
+        self._max_batch = max_batch
+        self._flush_interval = flush_interval_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._put_timeout = put_timeout_seconds
+        self._max_attempts = max_attempts
+        self._arrived = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.rejected = 0
+        self.written = 0
+        self.lost = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.flush_latency = LatencyStats()
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._flush_forever())
+
+    async def stop(self) -> None:
+        """Flush every buffered document, then stop the flusher"""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        self._arrived.set()
+        await self._task
+        self._task = None
+
+    async def submit(self, doc: Dict[str, Any]) -> None:
+        try:
+            await asyncio.wait_for(self._queue.put(doc), self._put_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise BufferFull()
+        self.submitted += 1
+        self._arrived.set()
+
+    async def _next_batch(self) -> Tuple[List[Dict[str, Any]], bool]:
+        """Collect up to max_batch documents; True once stop() was reached"""
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self._flush_interval
+        while len(batch) < self._max_batch:
+            try:
+                doc = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                # Waiting on the event, not on get(), so a timeout never drops a document
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                continue
+            if doc is _STOP:
+                return batch, True
+            batch.append(doc)
+        return batch, False
+
+    async def _flush_forever(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                await self._collection.insert_many(batch, ordered=False)
+                written = len(batch)
+                break
+            except BulkWriteError as exc:
+                # Duplicates of documents a failed attempt already wrote are fine
+                errors = exc.details.get("writeErrors", [])
+                written = exc.details.get("nInserted", 0) + sum(e.get("code") == 11000 for e in errors)
+                break
+            except Exception:
+                if attempt == self._max_attempts:
+                    logger.exception("Dropping %d buffered documents after %d attempts", len(batch), attempt)
+                    written = 0
+                    break
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        self.flush_latency.record(time.perf_counter() - started, error=written < len(batch))
+        self.written += written
+        self.lost += len(batch) - written
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "lost": self.lost,
+            "batches": self.batches,
+            "mean_batch_size": (self.written + self.lost) / self.batches if self.batches else None,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "flush_latency": self.flush_latency.snapshot(),
+        }
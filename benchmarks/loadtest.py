@@ -0,0 +1,343 @@
+"""Async load test of the booking API with per-endpoint latency percentiles.
+
+Boots ``server.py`` with uvicorn against a local mongod (in a throwaway
+database) and the fake Stripe server, replays a weighted mix of booking,
+availability, checkout, webhook and contact traffic, and reports p50/p95/p99
+latency and requests per second per endpoint:
+
+    python benchmarks/loadtest.py --duration 30 --concurrency 50 --output baseline.json
+    python benchmarks/loadtest.py --duration 30 --concurrency 50 --baseline baseline.json
+
+With ``--baseline`` the run is diffed against an earlier ``--output`` file
+and exits with status 1 when an endpoint's p95 grew by more than
+``--threshold`` percent or its throughput dropped by as much.
+
+Stripe calls only reach the fake when the installed Stripe wrapper goes
+through the ``stripe`` library, whose ``api_base`` ``STRIPE_API_BASE``
+overrides; the report counts the sessions the fake created so a run that
+missed it shows. The wrapper verifies webhook signatures with its own
+secret, which nothing here configures, so the ``webhook`` scenario is off
+by default: add it to ``--mix`` with ``--webhook-secret`` set to the
+secret your wrapper checks against.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+import httpx  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+import fake_stripe  # noqa: E402
+
+API_KEY = "sk_test_load"
+
+DEFAULT_MIX = "check_availability=30,availability=10,list_bookings=15,create_booking=15,checkout=15,contact=15"
+
+# Statuses that are a correct answer under load rather than a failure. A
+# checkout racing the webhook that paid its booking gets a 400.
+EXPECTED = {"create_booking": {201, 409}, "checkout": {200, 400, 409}}
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    unknown = set(weights) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return weights
+
+
+class State:
+    """What earlier requests created, for later ones to act on"""
+
+    def __init__(self, rng: random.Random, days: int):
+        self.rng = rng
+        self.dates = [(date.today() + timedelta(days=30 + i)).isoformat() for i in range(days)]
+        # Bookings still unpaid, and the booking of every open session
+        self.bookings: List[str] = []
+        self.sessions: Dict[str, str] = {}
+        self.webhook_secret: Optional[str] = None
+
+    def date(self) -> str:
+        return self.rng.choice(self.dates)
+
+    def slot(self):
+        """Start and end time of a two hour ride between 6 AM and 9 PM"""
+        start = self.rng.randrange(6, 20)
+        return _clock_time(start), _clock_time(start + 2)
+
+
+def _clock_time(hour: int) -> str:
+    return f"{(hour - 1) % 12 + 1}:00 {'AM' if hour < 12 else 'PM'}"
+
+
+async def create_booking(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    start, end = state.slot()
+    response = await client.post("/api/bookings", json={
+        "date": state.date(), "start_time": start, "end_time": end,
+        "pickup_location": "Hartsfield-Jackson Airport", "dropoff_location": "Midtown Atlanta",
+        "full_name": "Load Tester", "email": "load@example.com", "phone": "555-0100",
+        "duration_hours": 2, "total_price": 150.0, "deposit_amount": 75.0,
+    })
+    if response.status_code == 201:
+        state.bookings.append(response.json()["id"])
+    return response
+
+
+async def check_availability(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    start, end = state.slot()
+    return await client.get("/api/bookings/check-availability", params={
+        "date": state.date(), "start_time": start, "end_time": end,
+    })
+
+
+async def availability(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    first = state.date()
+    last = (date.fromisoformat(first) + timedelta(days=6)).isoformat()
+    return await client.get("/api/availability", params={"from": first, "to": last})
+
+
+async def list_bookings(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.get("/api/bookings", params={"date": state.date()})
+
+
+async def checkout(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    booking_id = state.rng.choice(state.bookings)
+    response = await client.post("/api/payments/checkout", json={
+        "booking_id": booking_id, "origin_url": "http://localhost:3000",
+    })
+    if response.status_code == 200:
+        state.sessions[response.json()["session_id"]] = booking_id
+    return response
+
+
+async def webhook(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    session_id = state.rng.choice(list(state.sessions))
+    payload = fake_stripe.checkout_completed_event(session_id)
+    response = await client.post("/api/webhook/stripe", content=payload, headers={
+        "Stripe-Signature": fake_stripe.sign_payload(payload, state.webhook_secret),
+        "Content-Type": "application/json",
+    })
+    if response.status_code == 200:
+        # Paid now, so later checkouts pick other bookings
+        booking_id = state.sessions.pop(session_id, None)
+        if booking_id in state.bookings:
+            state.bookings.remove(booking_id)
+    return response
+
+
+async def contact(client: httpx.AsyncClient, state: State) -> httpx.Response:
+    return await client.post("/api/contact", json={
+        "name": "Load Tester", "email": "load@example.com", "phone": "555-0100",
+        "message": "Do you have availability for a wedding party of eight?",
+    })
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "create_booking": create_booking,
+    "check_availability": check_availability,
+    "availability": availability,
+    "list_bookings": list_bookings,
+    "checkout": checkout,
+    "webhook": webhook,
+    "contact": contact,
+}
+
+
+def runnable(name: str, state: State) -> str:
+    """The scenario itself, or what has to happen first when it has nothing to act on"""
+    if name == "webhook" and not state.sessions:
+        name = "checkout"
+    if name == "checkout" and not state.bookings:
+        name = "create_booking"
+    return name
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+async def run_load(base_url: str, weights: Dict[str, int], args) -> Dict[str, Any]:
+    state = State(random.Random(args.seed), args.days)
+    state.webhook_secret = args.webhook_secret
+    names = list(weights)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    failures: Dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + args.duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                name = runnable(state.rng.choices(names, [weights[n] for n in names])[0], state)
+                started = time.perf_counter()
+                try:
+                    response = await SCENARIOS[name](client, state)
+                except httpx.HTTPError as exc:
+                    statuses[name][type(exc).__name__] += 1
+                    failures[name] += 1
+                    continue
+                latencies[name].append(time.perf_counter() - started)
+                statuses[name][str(response.status_code)] += 1
+                if response.status_code not in EXPECTED.get(name, {200, 201, 304}):
+                    failures[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name in sorted(latencies.keys() | failures.keys()):
+        values = sorted(latencies[name])
+        endpoints[name] = {
+            "requests": len(values),
+            "requests_per_second": len(values) / elapsed,
+            "failures": failures[name],
+            "statuses": dict(statuses[name]),
+            "p50_ms": _ms(percentile(values, 0.50)),
+            "p95_ms": _ms(percentile(values, 0.95)),
+            "p99_ms": _ms(percentile(values, 0.99)),
+            "max_ms": _ms(values[-1] if values else None),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "config": {
+            "duration": args.duration, "concurrency": args.concurrency,
+            "mix": weights, "seed": args.seed, "days": args.days,
+        },
+        "elapsed_seconds": elapsed,
+        "requests_per_second": total / elapsed,
+        "fake_stripe_sessions": fake_stripe.created_sessions(),
+        "endpoints": endpoints,
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"{'endpoint':<20}{'req':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fail':>7}")
+    for name, e in result["endpoints"].items():
+        row = [e["p50_ms"], e["p95_ms"], e["p99_ms"]]
+        cells = "".join(f"{v:>10.2f}" if v is not None else f"{'-':>10}" for v in row)
+        print(f"{name:<20}{e['requests']:>8}{e['requests_per_second']:>10.1f}{cells}{e['failures']:>7}")
+    print(f"total: {result['requests_per_second']:.1f} req/s over {result['elapsed_seconds']:.1f}s")
+    checkouts = result["endpoints"].get("checkout", {}).get("statuses", {}).get("200", 0)
+    if checkouts and not result["fake_stripe_sessions"]:
+        print("warning: checkouts succeeded but the fake Stripe created no sessions; STRIPE_API_BASE was not used")
+
+
+def diff_against(baseline: Dict[str, Any], result: Dict[str, Any], threshold: float) -> List[str]:
+    """Endpoints that regressed by more than ``threshold`` percent"""
+    regressions = []
+    print(f"\n{'vs baseline':<20}{'p95':>12}{'req/s':>12}")
+    for name, now in result["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before or not before["p95_ms"] or not now["p95_ms"] or not before["requests_per_second"]:
+            continue
+        p95 = (now["p95_ms"] / before["p95_ms"] - 1) * 100
+        rps = (now["requests_per_second"] / before["requests_per_second"] - 1) * 100
+        print(f"{name:<20}{p95:>+11.1f}%{rps:>+11.1f}%")
+        if p95 > threshold or rps < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(port: int, env: Dict[str, str], workers: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND, env={**os.environ, **env},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"server.py exited with status {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/readyz", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("server.py did not come up within 30s")
+
+
+def main(args) -> int:
+    weights = parse_mix(args.mix)
+    if "webhook" in weights and not args.webhook_secret:
+        raise SystemExit("The webhook scenario needs --webhook-secret")
+    stripe_port, port = free_port(), free_port()
+    db_name = f"loadtest_{uuid.uuid4().hex[:8]}"
+    fake_stripe.serve_in_thread(stripe_port)
+    backend = start_backend(port, {
+        "MONGO_URL": args.mongo_url,
+        "DB_NAME": db_name,
+        "STRIPE_API_KEY": API_KEY,
+        "STRIPE_API_BASE": f"http://127.0.0.1:{stripe_port}",
+    }, args.workers)
+    try:
+        result = asyncio.run(run_load(f"http://127.0.0.1:{port}", weights, args))
+    finally:
+        backend.terminate()
+        backend.wait(timeout=30)
+
+        async def drop():
+            client = AsyncIOMotorClient(args.mongo_url)
+            await client.drop_database(db_name)
+            client.close()
+
+        asyncio.run(drop())
+
+    print_report(result)
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+    if args.baseline:
+        regressions = diff_against(json.loads(Path(args.baseline).read_text()), result, args.threshold)
+        if regressions:
+            print(f"\nRegressed beyond {args.threshold:.0f}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default=os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,...")
+    parser.add_argument("--days", type=int, default=14, help="distinct dates the traffic spreads over")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--webhook-secret", help="secret the Stripe wrapper verifies webhooks with")
+    parser.add_argument("--output", help="write the result as JSON here")
+    parser.add_argument("--baseline", help="diff against an earlier --output file")
+    parser.add_argument("--threshold", type=float, default=20, help="allowed regression in percent")
+    sys.exit(main(parser.parse_args()))
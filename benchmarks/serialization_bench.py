@@ -0,0 +1,99 @@
+"""Per-request CPU of the booking response path, before and after the fast layer.
+
+Runs the request/response work of GET and POST /api/bookings in process,
+without Mongo: "before" re-validates through ``response_model`` and renders
+with the stdlib JSONResponse, "after" uses the trusted orjson responses.
+
+    python benchmarks/serialization_bench.py --rows 1000 --iterations 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from models import Booking, BookingCreate  # noqa: E402
+from responses import model_response, trusted_response  # noqa: E402
+from tests.conftest import BOOKING_INPUT  # noqa: E402
+
+LIST_FIELD = create_response_field(name="Response_bookings", type_=List[Booking], mode="serialization")
+BOOKING_FIELD = create_response_field(name="Response_booking", type_=Booking, mode="serialization")
+
+
+def stored_rows(count: int) -> List[dict]:
+    """Rows as Mongo returns them with the Booking projection"""
+    created = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            **BOOKING_INPUT,
+            "id": str(uuid.uuid4()),
+            "payment_status": "pending",
+            "session_id": None,
+            "vehicle_id": "default",
+            "special_requests": None,
+            "created_at": created + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+
+
+async def list_before(rows):
+    content = await serialize_response(field=LIST_FIELD, response_content=rows, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def list_after(rows):
+    return trusted_response(rows).body
+
+
+async def create_before(_):
+    booking_input = BookingCreate(**BOOKING_INPUT)
+    booking = Booking(**booking_input.model_dump())
+    booking.model_dump()
+    content = await serialize_response(field=BOOKING_FIELD, response_content=booking, is_coroutine=True)
+    return JSONResponse(content, status_code=201).body
+
+
+async def create_after(_):
+    booking_input = BookingCreate(**BOOKING_INPUT)
+    booking = Booking(**booking_input.model_dump())
+    booking.model_dump()
+    return model_response(Booking, booking, status_code=201).body
+
+
+async def cpu_per_call(fn, arg, iterations: int) -> float:
+    await fn(arg)  # build adapters and caches outside the measurement
+    started = time.process_time()
+    for _ in range(iterations):
+        await fn(arg)
+    return (time.process_time() - started) / iterations
+
+
+async def main(args) -> None:
+    rows = stored_rows(args.rows)
+    cases = [
+        (f"GET /api/bookings ({args.rows} rows)", list_before, list_after, rows, args.iterations),
+        ("POST /api/bookings", create_before, create_after, None, args.iterations * 20),
+    ]
+    for name, before, after, arg, iterations in cases:
+        old = await cpu_per_call(before, arg, iterations)
+        new = await cpu_per_call(after, arg, iterations)
+        print(f"{name}: before {old * 1e6:.0f}us  after {new * 1e6:.0f}us  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
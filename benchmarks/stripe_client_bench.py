@@ -0,0 +1,72 @@
+"""Throughput of Stripe status lookups against the local fake Stripe server.
+
+Compares building a StripeCheckout per request (the old behaviour) with the
+pooled StripeClientRegistry. Needs the backend requirements, no network:
+
+    python benchmarks/stripe_client_bench.py --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import fake_stripe  # noqa: E402
+from metrics import LatencyStats  # noqa: E402
+from stripe_client import StripeClientRegistry  # noqa: E402
+
+API_KEY = "sk_test_benchmark"
+
+
+async def run(lookup, session_id: str, total: int, concurrency: int) -> dict:
+    stats = LatencyStats(window=total)
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            await lookup(session_id)
+            stats.record(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"requests_per_second": total / elapsed, **stats.snapshot()}
+
+
+async def main(args) -> None:
+    from emergentintegrations.payments.stripe.checkout import StripeCheckout
+
+    registry = StripeClientRegistry(
+        API_KEY,
+        max_concurrency=args.concurrency,
+        pool_size=args.concurrency,
+        api_base=f"http://127.0.0.1:{args.port}",
+    )
+    await registry.start()
+    session = await registry.create_checkout_session("", registry.checkout_request(
+        amount=75.0, currency="usd",
+        success_url="http://localhost/success", cancel_url="http://localhost/cancel",
+    ))
+
+    async def per_request(session_id):
+        return await StripeCheckout(api_key=API_KEY, webhook_url="").get_checkout_status(session_id)
+
+    for name, lookup in (("per_request", per_request), ("registry", registry.get_checkout_status)):
+        result = await run(lookup, session.session_id, args.requests, args.concurrency)
+        print(f"{name:>12}: {result['requests_per_second']:8.1f} req/s  "
+              f"p50 {result['p50_seconds'] * 1000:6.2f} ms  p99 {result['p99_seconds'] * 1000:6.2f} ms")
+
+    await registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=12111)
+    args = parser.parse_args()
+    fake_stripe.serve_in_thread(args.port)
+    asyncio.run(main(args))
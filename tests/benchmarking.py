@@ -0,0 +1,79 @@
+"""Timing harness behind the ``benchmark`` fixture.
+
+Each benchmark times ``rounds`` calls after ``warmup`` untimed ones and is
+checked against its median limit in ``benchmark_thresholds.json``. Results
+are collected per session and written as JSON by ``conftest.py``.
+"""
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+THRESHOLDS_FILE = Path(__file__).resolve().parent / "benchmark_thresholds.json"
+
+
+def load_thresholds(path: Path = THRESHOLDS_FILE) -> Dict[str, float]:
+    """Median limits in microseconds by benchmark name"""
+    return {name: limit["median_us"] for name, limit in json.loads(path.read_text()).items()}
+
+
+class Benchmark:
+    def __init__(self, name: str, results: Dict[str, Dict[str, Any]],
+                 thresholds: Dict[str, float], threshold_scale: float = 1.0):
+        self.name = name
+        self._results = results
+        self._thresholds = thresholds
+        self._scale = threshold_scale
+
+    def __call__(self, fn: Callable[[], Any], rounds: int = 1000, warmup: int = 50) -> Any:
+        result = None
+        for _ in range(warmup):
+            result = fn()
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - started)
+        self._record(timings)
+        return result
+
+    def run_async(self, fn: Callable[[], Awaitable[Any]], rounds: int = 500, warmup: int = 20,
+                  setup: Optional[Callable[[], Awaitable[None]]] = None) -> Any:
+        """Time awaits of ``fn()`` inside one event loop, after ``setup``"""
+        async def scenario():
+            if setup is not None:
+                await setup()
+            result = None
+            for _ in range(warmup):
+                result = await fn()
+            timings = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                result = await fn()
+                timings.append(time.perf_counter() - started)
+            return result, timings
+
+        result, timings = asyncio.run(scenario())
+        self._record(timings)
+        return result
+
+    def _record(self, timings) -> None:
+        median_us = statistics.median(timings) * 1e6
+        limit = self._thresholds.get(self.name)
+        if limit is not None:
+            limit *= self._scale
+        self._results[self.name] = {
+            "rounds": len(timings),
+            "min_us": round(min(timings) * 1e6, 3),
+            "median_us": round(median_us, 3),
+            "mean_us": round(statistics.fmean(timings) * 1e6, 3),
+            "stdev_us": round(statistics.pstdev(timings) * 1e6, 3),
+            "ops_per_second": round(1 / statistics.median(timings), 1),
+            "threshold_us": limit,
+            "passed": limit is None or median_us <= limit,
+        }
+        assert limit is None or median_us <= limit, (
+            f"{self.name}: median {median_us:.1f}us exceeds the {limit:.1f}us threshold"
+        )
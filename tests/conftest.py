@@ -0,0 +1,185 @@
+import asyncio
+import json
+import os
+import sys
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+# The backend is run from its own directory and imports its modules flat
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# server.py reads these at import time; tests replace its database with the
+# in-process stand-in (``memory_db``), so nothing connects to them
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:1")
+os.environ.setdefault("DB_NAME", "tests")
+
+from tests.benchmarking import Benchmark, load_thresholds  # noqa: E402
+
+_benchmark_results = {}
+
+# A valid POST /api/bookings payload
+BOOKING_INPUT = {
+    "date": "2030-01-15",
+    "start_time": "09:00 AM",
+    "end_time": "11:00 AM",
+    "pickup_location": "1 Main St",
+    "dropoff_location": "2 Side St",
+    "full_name": "Sam Rider",
+    "email": "sam@example.com",
+    "phone": "555-0100",
+    "duration_hours": 2,
+    "total_price": 150,
+    "deposit_amount": 75,
+}
+
+# Server for the tests needing a real mongod; they are skipped when it does not answer
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+_mongo_reachable: Optional[bool] = None
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--benchmark", action="store_true",
+                    help="run the tests marked benchmark (skipped otherwise)")
+    group.addoption("--benchmark-json", default="benchmark-results.json",
+                    help="where to write benchmark results (default: %(default)s)")
+    group.addoption("--benchmark-threshold-scale", type=float, default=1.0,
+                    help="multiply every regression threshold, for slower machines")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: microbenchmark, run with --benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def benchmark(request):
+    return Benchmark(
+        request.node.name,
+        _benchmark_results,
+        load_thresholds(),
+        request.config.getoption("--benchmark-threshold-scale"),
+    )
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    """Point the server's database, schedules, rollups and fleet at the in-process stand-in"""
+    import server
+    from fleet import Fleet
+    from rollups import DailyRollups
+    from schedules import DailySchedules
+    from tests.memory_mongo import MemoryDatabase
+
+    db = MemoryDatabase()
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "daily_schedules", DailySchedules(db.daily_schedules, server._load_blocking_bookings))
+    monkeypatch.setattr(server, "daily_rollups", DailyRollups(db.daily_rollups))
+    monkeypatch.setattr(server, "fleet", Fleet(db.vehicles))
+    return db
+
+
+class FakeCheckout:
+    """Stripe checkout calls answered in process; ``requests`` records each session asked for"""
+
+    def __init__(self):
+        self.requests = []
+
+    @staticmethod
+    def checkout_request(**fields):
+        return SimpleNamespace(**fields)
+
+    async def create_checkout_session(self, webhook_url: str, request):
+        # A real call yields while Stripe answers
+        await asyncio.sleep(0)
+        self.requests.append(request)
+        session_id = f"cs_test_{len(self.requests)}"
+        return SimpleNamespace(session_id=session_id, url=f"https://checkout.stripe.test/pay/{session_id}")
+
+
+@pytest.fixture
+def stripe_checkout(monkeypatch):
+    """Point the server's Stripe registry at a ``FakeCheckout``"""
+    import server
+
+    fake = FakeCheckout()
+    monkeypatch.setattr(server.stripe_clients, "_api_key", "sk_test_fake")
+    monkeypatch.setattr(server.stripe_clients, "checkout_request", fake.checkout_request)
+    monkeypatch.setattr(server.stripe_clients, "create_checkout_session", fake.create_checkout_session)
+    return fake
+
+
+def _mongo_available() -> bool:
+    """Whether ``TEST_MONGO_URL`` answers a ping; asked once per session"""
+    global _mongo_reachable
+    if _mongo_reachable is None:
+        async def ping() -> bool:
+            client = AsyncIOMotorClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500)
+            try:
+                await client.admin.command("ping")
+                return True
+            except PyMongoError:
+                return False
+            finally:
+                client.close()
+
+        _mongo_reachable = asyncio.run(ping())
+    return _mongo_reachable
+
+
+class MongoTestDatabase:
+    """A throwaway database on ``TEST_MONGO_URL``, dropped after the test.
+
+    Tests run their own event loop, so ``connect`` opens a client inside it:
+    ``async with mongo_db.connect() as db: ...``.
+    """
+
+    def __init__(self, url: str, name: str):
+        self.url = url
+        self.name = name
+
+    @asynccontextmanager
+    async def connect(self):
+        client = AsyncIOMotorClient(self.url, tz_aware=True)
+        try:
+            yield client[self.name]
+        finally:
+            client.close()
+
+    async def drop(self) -> None:
+        async with self.connect() as db:
+            await db.client.drop_database(self.name)
+
+
+@pytest.fixture
+def mongo_db(request):
+    if not _mongo_available():
+        pytest.skip(f"no mongod at {TEST_MONGO_URL}")
+    name = f"{request.module.__name__.split('.')[-1]}_{uuid.uuid4().hex[:8]}"
+    database = MongoTestDatabase(TEST_MONGO_URL, name)
+    yield database
+    asyncio.run(database.drop())
+
+
+def pytest_sessionfinish(session):
+    if _benchmark_results:
+        path = Path(session.config.getoption("--benchmark-json"))
+        path.write_text(json.dumps({
+            "python": sys.version.split()[0],
+            "benchmarks": dict(sorted(_benchmark_results.items())),
+        }, indent=2) + "\n")
@@ -0,0 +1,293 @@
+"""In-process stand-in for the slice of Motor the backend uses.
+
+Enough of the query and update language for the booking, schedule and
+fleet code paths: equality, ``$in``/``$gt``/``$gte``/``$lt``/``$lte``/
+``$ne``/``$exists``/``$type: "date"``, ``$and``/``$or``, inclusion and
+``_id`` exclusion projections, and ``$set``/``$unset``/``$inc``/``$max``/
+``$pull``/``$setOnInsert`` updates. Sorts follow Mongo's order across
+types. Documents are copied in and out, the way BSON round-trips them, so
+callers can't alias stored state.
+"""
+import itertools
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+_MISSING = object()
+_ids = itertools.count(1)
+
+
+def _clone(value):
+    """Copy of nested dicts and lists; leaves are immutable in practice"""
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+def _compare(value, op: str, operand) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+        if op == "$lt":
+            return value < operand
+        return value <= operand
+    except TypeError:
+        # Mongo never matches across BSON types
+        return False
+
+
+def _sort_key(value):
+    """Mongo's cross-type order: null, numbers, strings, objects, arrays, booleans, dates"""
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (5, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (6, value)
+    return (3 if isinstance(value, dict) else 4, repr(value))
+
+
+def _matches_condition(value, condition) -> bool:
+    if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+        for op, operand in condition.items():
+            if op == "$in":
+                if not any(_equals(value, o) for o in operand):
+                    return False
+            elif op == "$ne":
+                if _equals(value, operand):
+                    return False
+            elif op == "$exists":
+                if (value is not _MISSING) != bool(operand):
+                    return False
+            elif op == "$type":
+                if operand != "date":
+                    raise NotImplementedError(f"$type {operand}")
+                if not isinstance(value, datetime):
+                    return False
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if not _compare(value, op, operand):
+                    return False
+            else:
+                raise NotImplementedError(op)
+        return True
+    return _equals(value, condition)
+
+
+def _equals(value, operand) -> bool:
+    if operand is None:
+        return value is _MISSING or value is None
+    return value is not _MISSING and value == operand
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif not _matches_condition(doc.get(key, _MISSING), condition):
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return _clone(doc)
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        keep = set(included)
+        if projection.get("_id", 1):
+            keep.add("_id")
+        return {k: _clone(v) for k, v in doc.items() if k in keep}
+    return {k: _clone(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> None:
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            doc.update(_clone(fields))
+        elif op == "$setOnInsert":
+            continue
+        elif op == "$unset":
+            for key in fields:
+                doc.pop(key, None)
+        elif op == "$max":
+            for key, value in fields.items():
+                if doc.get(key) is None or value > doc[key]:
+                    doc[key] = _clone(value)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                *parents, key = path.split(".")
+                target = doc
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[key] = target.get(key, 0) + amount
+        elif op == "$pull":
+            for key, condition in fields.items():
+                doc[key] = [
+                    item for item in doc.get(key, [])
+                    if not (matches(item, condition) if isinstance(item, dict) else _equals(item, condition))
+                ]
+        else:
+            raise NotImplementedError(op)
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids: List[Any]):
+        self.inserted_ids = inserted_ids
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class MemoryCursor:
+    def __init__(self, docs: List[Dict[str, Any]], projection):
+        self._docs = docs
+        self._projection = projection
+        self._sort: List = []
+        self._limit = 0
+
+    def sort(self, keys, direction=None):
+        self._sort = [(keys, direction or 1)] if isinstance(keys, str) else list(keys)
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        return self
+
+    def _results(self) -> List[Dict[str, Any]]:
+        docs = list(self._docs)
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda d: _sort_key(d.get(key, _MISSING)), reverse=direction < 0)
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length: Optional[int]) -> List[Dict[str, Any]]:
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._results():
+            yield doc
+
+
+class MemoryCollection:
+    def __init__(self):
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+
+    def _matching(self, query: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+        if set(query) == {"_id"} and not isinstance(query["_id"], dict):
+            doc = self._docs.get(query["_id"])
+            return [doc] if doc is not None else []
+        return [d for d in self._docs.values() if matches(d, query)]
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection=None, **kwargs) -> MemoryCursor:
+        return MemoryCursor(list(self._matching(query or {})), projection)
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection=None, sort=None):
+        if sort:
+            docs = await self.find(query, projection).sort(sort).limit(1).to_list(1)
+            return docs[0] if docs else None
+        for doc in self._matching(query or {}):
+            return _project(doc, projection)
+        return None
+
+    async def count_documents(self, query: Dict[str, Any], limit: int = 0) -> int:
+        count = len(list(self._matching(query)))
+        return min(count, limit) if limit else count
+
+    def _insert(self, doc: Dict[str, Any]) -> None:
+        doc.setdefault("_id", next(_ids))
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"duplicate _id {doc['_id']!r}")
+        self._docs[doc["_id"]] = _clone(doc)
+
+    async def insert_one(self, doc: Dict[str, Any]):
+        self._insert(doc)
+
+    async def insert_many(self, docs: Iterable[Dict[str, Any]], ordered: bool = True):
+        inserted, errors = [], []
+        for index, doc in enumerate(docs):
+            try:
+                self._insert(doc)
+            except DuplicateKeyError as exc:
+                errors.append({"index": index, "code": 11000, "errmsg": str(exc)})
+                if ordered:
+                    break
+                continue
+            inserted.append(doc["_id"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return InsertManyResult(inserted)
+
+    def _upsert(self, query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        _apply_update(doc, update, inserting=True)
+        self._insert(doc)
+        return self._docs[doc["_id"]]
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        for doc in self._matching(query):
+            _apply_update(doc, update, inserting=False)
+            return UpdateResult(1, 1)
+        if upsert:
+            return UpdateResult(0, 0, self._upsert(query, update)["_id"])
+        return UpdateResult(0, 0)
+
+    async def update_many(self, query: Dict[str, Any], update: Dict[str, Any]):
+        docs = list(self._matching(query))
+        for doc in docs:
+            _apply_update(doc, update, inserting=False)
+        return UpdateResult(len(docs), len(docs))
+
+    async def find_one_and_update(
+        self, query: Dict[str, Any], update: Dict[str, Any], projection=None,
+        return_document=ReturnDocument.BEFORE, upsert: bool = False, **kwargs
+    ):
+        for doc in self._matching(query):
+            before = _project(doc, projection)
+            _apply_update(doc, update, inserting=False)
+            return _project(doc, projection) if return_document == ReturnDocument.AFTER else before
+        if upsert:
+            doc = self._upsert(query, update)
+            return _project(doc, projection) if return_document == ReturnDocument.AFTER else None
+        return None
+
+
+class MemoryDatabase:
+    """Collections are created on first access, like Motor's"""
+
+    def __init__(self):
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection()
+        return self._collections[name]
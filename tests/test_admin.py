@@ -0,0 +1,62 @@
+"""Staff endpoints refuse callers without the X-Admin-Token header"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import server
+from models import BookingCreate
+from tests.conftest import BOOKING_INPUT
+
+TOKEN = "s3cret-admin"
+
+
+def make_request(token=None):
+    headers = [(b"x-admin-token", token.encode())] if token else []
+    return Request({"type": "http", "method": "POST", "path": "/", "query_string": b"", "headers": headers})
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", TOKEN)
+
+
+def create_booking():
+    async def create():
+        await server.create_booking(BookingCreate(**BOOKING_INPUT))
+        return (await server.db.bookings.find_one({}))["id"]
+
+    return asyncio.run(create())
+
+
+def test_cancel_is_hidden_without_a_configured_token(memory_db):
+    booking_id = create_booking()
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(server.cancel_booking(booking_id, make_request(TOKEN)))
+
+    assert raised.value.status_code == 404
+
+
+def test_cancel_needs_the_admin_token(memory_db, admin_token):
+    booking_id = create_booking()
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(server.cancel_booking(booking_id, make_request("guess")))
+    cancelled = asyncio.run(server.cancel_booking(booking_id, make_request(TOKEN)))
+
+    assert raised.value.status_code == 403
+    assert cancelled["payment_status"] == "cancelled"
+
+
+def test_analytics_needs_the_admin_token(memory_db, admin_token):
+    create_booking()
+    date = BOOKING_INPUT["date"]
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(server.get_analytics(make_request(), from_date=date, to_date=date))
+    report = asyncio.run(server.get_analytics(make_request(TOKEN), from_date=date, to_date=date))
+
+    assert raised.value.status_code == 403
+    assert report["totals"]["deposits_pending"] == BOOKING_INPUT["deposit_amount"]
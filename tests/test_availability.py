@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+
+from availability import (
+    DayIntervals,
+    FleetDay,
+    blocked_interval,
+    minutes_to_time,
+)
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def booking(booking_id, start, end, status="paid", hold_expires_at=None, vehicle_id=None):
+    return {
+        "id": booking_id,
+        "vehicle_id": vehicle_id,
+        "date": "2026-03-02",
+        "start_time": start,
+        "end_time": end,
+        "payment_status": status,
+        "hold_expires_at": hold_expires_at,
+    }
+
+
+def test_conflict_includes_buffer():
+    day = DayIntervals([blocked_interval(booking("a", "09:00 AM", "11:00 AM"))])
+
+    conflict = day.find_conflict(12 * 60, 13 * 60)
+    assert minutes_to_time(conflict.blocked_until) == "12:30 PM"
+    assert day.find_conflict(12 * 60 + 30, 13 * 60) is None
+    assert day.find_conflict(7 * 60, 9 * 60) is None
+
+
+def test_conflict_reports_latest_blocking_booking():
+    day = DayIntervals([
+        blocked_interval(booking("a", "08:00 AM", "02:00 PM")),
+        blocked_interval(booking("b", "09:00 AM", "10:00 AM")),
+    ])
+    day.remove("a")
+    day.add(blocked_interval(booking("c", "08:30 AM", "11:00 AM")))
+
+    assert day.find_conflict(10 * 60, 11 * 60).booking_id == "c"
+    assert day.find_conflict(13 * 60, 14 * 60) is None
+
+
+def test_expired_hold_stops_blocking():
+    hold = NOW + timedelta(minutes=30)
+    day = DayIntervals([
+        blocked_interval(booking("a", "09:00 AM", "11:00 AM", "pending", hold)),
+    ])
+
+    assert day.find_conflict(10 * 60, 11 * 60, now=NOW) is not None
+    assert day.find_conflict(10 * 60, 11 * 60, now=hold) is None
+    assert len(day) == 0
+
+
+def test_fleet_is_available_while_one_vehicle_is_free():
+    day = FleetDay([
+        booking("a", "09:00 AM", "11:00 AM", vehicle_id="v1"),
+        booking("b", "10:00 AM", "12:00 PM", vehicle_id="v2"),
+    ])
+
+    assert day.find_conflict(10 * 60, 11 * 60, ["v1", "v2", "v3"]) is None
+    conflict = day.find_conflict(10 * 60, 11 * 60, ["v1", "v2"])
+    # v1 frees up first, at 12:30 PM
+    assert conflict.booking_id == "a"
+
+
+def test_best_fit_picks_the_tightest_free_vehicle():
+    day = FleetDay([
+        booking("a", "06:00 AM", "08:00 AM", vehicle_id="v1"),
+        booking("b", "06:00 AM", "10:00 AM", vehicle_id="v2"),
+        booking("c", "02:00 PM", "03:00 PM", vehicle_id="v2"),
+    ])
+
+    # v2 is free from 11:30 AM until 2 PM, leaving the least idle time
+    assert day.best_fit(11 * 60 + 30, 13 * 60, ["v1", "v2", "v3"]) == "v2"
+    assert day.best_fit(10 * 60, 11 * 60, ["v2"]) is None
+
+
+def test_bookings_without_vehicle_are_on_the_default_vehicle():
+    day = FleetDay([booking("a", "09:00 AM", "11:00 AM")])
+
+    assert day.find_conflict(10 * 60, 11 * 60, ["default"]) is not None
+    assert day.find_conflict(10 * 60, 11 * 60, ["default", "v2"]) is None
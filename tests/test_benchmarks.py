@@ -0,0 +1,147 @@
+"""Microbenchmarks of the scheduling and serialization hot paths.
+
+Skipped unless pytest runs with ``--benchmark``; the endpoints run against
+the in-process Mongo stand-in, so no services are needed:
+
+    python -m pytest tests -m benchmark --benchmark --benchmark-json bench.json
+
+Each result is checked against ``benchmark_thresholds.json``.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from starlette.requests import Request
+
+import server
+from availability import FleetDay, booking_minutes, minutes_to_time, time_to_minutes
+from models import Booking, BookingCreate
+from responses import model_response, trusted_response
+from schedules import schedule_entry
+from tests.conftest import BOOKING_INPUT
+
+pytestmark = pytest.mark.benchmark
+
+DATE = BOOKING_INPUT["date"]
+NOW = datetime.now(timezone.utc)
+# Bookings one vehicle fits in a day: 1 hour each plus the 90 minute buffer
+PER_VEHICLE = 8
+TIMES = [minutes_to_time(m) for m in range(0, 24 * 60, 15)]
+
+
+def make_request(headers=()):
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": list(headers)})
+
+
+def day_bookings(count):
+    """``count`` bookings packed onto ceil(count / 8) vehicles"""
+    bookings = []
+    for i in range(count):
+        start = 6 * 60 + (i % PER_VEHICLE) * 150
+        bookings.append({
+            **BOOKING_INPUT,
+            "id": f"booking-{i}",
+            "start_time": minutes_to_time(start),
+            "end_time": minutes_to_time(start + 60),
+            "payment_status": "paid" if i % 2 else "pending",
+            "hold_expires_at": None if i % 2 else NOW + timedelta(minutes=30),
+            "vehicle_id": f"vehicle-{i // PER_VEHICLE}",
+            "created_at": NOW + timedelta(seconds=i),
+            **booking_minutes(minutes_to_time(start), minutes_to_time(start + 60)),
+        })
+    return bookings
+
+
+def vehicles_for(count):
+    return [{"id": f"vehicle-{v}", "name": f"Vehicle {v}", "active": True, "created_at": NOW}
+            for v in range(max(1, math.ceil(count / PER_VEHICLE)))]
+
+
+async def seed(db, count):
+    bookings = day_bookings(count)
+    await db.vehicles.insert_many(vehicles_for(count))
+    await db.bookings.insert_many(bookings)
+    await db.daily_schedules.insert_one(
+        {"_id": DATE, "version": 1, "entries": [schedule_entry(b) for b in bookings]}
+    )
+
+
+def test_time_to_minutes(benchmark):
+    minutes = benchmark(lambda: [time_to_minutes(t) for t in TIMES])
+    assert minutes == list(range(0, 24 * 60, 15))
+
+
+def test_minutes_to_time(benchmark):
+    assert benchmark(lambda: [minutes_to_time(m) for m in range(0, 24 * 60, 15)]) == TIMES
+
+
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_find_conflict(benchmark, count):
+    entries = [schedule_entry(b) for b in day_bookings(count)]
+    vehicles = [v["id"] for v in vehicles_for(count)]
+    # Free only after the last vehicle's final booking, so every lane is checked
+    start = time_to_minutes("11:30 PM")
+
+    conflict = benchmark(lambda: FleetDay(entries).find_conflict(start, start + 15, vehicles))
+
+    assert conflict is None
+
+
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_check_availability_endpoint(benchmark, memory_db, count):
+    request = make_request()
+
+    response = benchmark.run_async(
+        lambda: server.check_availability(request, DATE, "10:00 AM", "11:00 AM"),
+        setup=lambda: seed(memory_db, count),
+        rounds=200,
+    )
+
+    assert response.status_code == 200
+    assert b'"available":false' in response.body
+
+
+def test_booking_model_round_trip(benchmark):
+    def round_trip():
+        booking = Booking(**BookingCreate(**BOOKING_INPUT).model_dump())
+        doc = booking.model_dump()
+        doc.update(booking_minutes(doc["start_time"], doc["end_time"]))
+        return model_response(Booking, booking, status_code=201)
+
+    assert benchmark(round_trip).status_code == 201
+
+
+def test_create_booking_endpoint(benchmark, memory_db):
+    days = iter(range(10_000))
+
+    async def create():
+        # A fresh date each round, so the schedule being reserved stays the same size
+        day = (datetime(2030, 1, 1) + timedelta(days=next(days))).strftime("%Y-%m-%d")
+        return await server.create_booking(BookingCreate(**{**BOOKING_INPUT, "date": day}))
+
+    response = benchmark.run_async(create, rounds=300)
+
+    assert response.status_code == 201
+
+
+def test_booking_rows_to_json(benchmark):
+    fields = set(Booking.model_fields)
+    rows = [{k: v for k, v in b.items() if k in fields} for b in day_bookings(1000)]
+
+    response = benchmark(lambda: trusted_response(rows), rounds=200)
+
+    assert response.body.startswith(b'[{"')
+
+
+def test_get_bookings_endpoint(benchmark, memory_db):
+    request = make_request()
+
+    response = benchmark.run_async(
+        lambda: server.get_bookings(request, date=None, limit=1000, cursor=None, format=None),
+        setup=lambda: seed(memory_db, 1000),
+        rounds=50,
+        warmup=5,
+    )
+
+    assert response.body.count(b'"id"') == 1000
+    assert "x-next-cursor" not in response.headers
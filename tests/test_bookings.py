@@ -0,0 +1,141 @@
+"""Listing bookings: ETags per date, keyset pages and NDJSON streaming"""
+import asyncio
+import base64
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import server
+from holds import HoldSweeper, utc_now
+from models import BookingCreate
+from tests.conftest import BOOKING_INPUT
+
+DATE = BOOKING_INPUT["date"]
+
+
+def make_request(headers=()):
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": list(headers)})
+
+
+async def list_date():
+    return await server.get_bookings(make_request(), date=DATE, limit=None, cursor=None, format=None)
+
+
+async def book(start_time, end_time):
+    response = await server.create_booking(
+        BookingCreate(**{**BOOKING_INPUT, "start_time": start_time, "end_time": end_time})
+    )
+    return orjson.loads(response.body)["id"]
+
+
+def test_every_booking_write_moves_the_date_etag(memory_db, stripe_checkout, monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "token")
+    admin = make_request([(b"x-admin-token", b"token")])
+    during_checkout = []
+    create_session = server.stripe_clients.create_checkout_session
+
+    async def create_while_listing(webhook_url, request):
+        # A listing landing while Stripe answers must not be cached past the session_id write
+        during_checkout.append(await list_date())
+        return await create_session(webhook_url, request)
+
+    monkeypatch.setattr(server.stripe_clients, "create_checkout_session", create_while_listing)
+
+    async def scenario():
+        etags = [(await list_date()).headers["etag"]]
+
+        async def after(write):
+            result = await write
+            listed = await list_date()
+            etags.append(listed.headers["etag"])
+            return result, listed
+
+        (paid_id, _), (cancelled_id, _), (expired_id, _) = [
+            await after(book(start, end))
+            for start, end in (("09:00 AM", "11:00 AM"), ("01:00 PM", "03:00 PM"), ("05:00 PM", "07:00 PM"))
+        ]
+        checkout = server.CheckoutRequest(booking_id=paid_id, origin_url="https://example.com")
+        session, listed = await after(server._open_checkout_session(checkout, "https://example.com/api/webhook/stripe"))
+        await after(server.transition_payment(session["session_id"], "paid"))
+        await after(server.cancel_booking(cancelled_id, admin))
+        await memory_db.bookings.update_one(
+            {"id": expired_id}, {"$set": {"hold_expires_at": utc_now() - timedelta(minutes=1)}}
+        )
+        sweeper = HoldSweeper(memory_db.bookings, server._expire_bookings, server._BOOKING_CHANGE_PROJECTION)
+        await after(sweeper.sweep())
+        return etags, listed
+
+    etags, listed = asyncio.run(scenario())
+
+    assert len(set(etags)) == len(etags) == 8
+    assert during_checkout[0].headers["etag"] != listed.headers["etag"]
+    assert [b["session_id"] for b in orjson.loads(listed.body)] == ["cs_test_1", None, None]
+
+
+def stored_booking(n, created_at):
+    return {
+        **BOOKING_INPUT, "id": f"booking-{n}", "payment_status": "pending", "session_id": None,
+        "vehicle_id": "default", "special_requests": None, "created_at": created_at,
+    }
+
+
+# Rows not yet migrated to BSON dates keep ISO strings, which Mongo sorts before every date
+CREATED = datetime(2030, 1, 1, tzinfo=timezone.utc)
+MIXED_ROWS = [
+    stored_booking(1, (CREATED + timedelta(minutes=2)).isoformat()),
+    stored_booking(2, CREATED.isoformat()),
+    stored_booking(3, CREATED.isoformat()),
+    stored_booking(4, CREATED + timedelta(minutes=1)),
+    stored_booking(5, CREATED),
+    stored_booking(6, CREATED),
+    stored_booking(7, CREATED + timedelta(minutes=3)),
+]
+MIXED_ORDER = ["booking-2", "booking-3", "booking-1", "booking-5", "booking-6", "booking-4", "booking-7"]
+
+
+def test_keyset_pages_cover_string_and_date_rows_once(memory_db):
+    async def scenario():
+        await memory_db.bookings.insert_many([dict(row) for row in MIXED_ROWS])
+        pages, cursor = [], None
+        while True:
+            response = await server.get_bookings(make_request(), date=None, limit=2, cursor=cursor, format=None)
+            pages.append([b["id"] for b in orjson.loads(response.body)])
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                return pages
+
+    pages = asyncio.run(scenario())
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert [booking_id for page in pages for booking_id in page] == MIXED_ORDER
+
+
+def test_ndjson_streams_every_row(memory_db):
+    async def scenario():
+        await memory_db.bookings.insert_many([dict(row) for row in MIXED_ROWS])
+        request = make_request([(b"accept", b"application/x-ndjson")])
+        response = await server.get_bookings(request, date=None, limit=None, cursor=None, format=None)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        return response, body
+
+    response, body = asyncio.run(scenario())
+
+    assert response.media_type == "application/x-ndjson"
+    assert [orjson.loads(line)["id"] for line in body.splitlines()] == MIXED_ORDER
+
+
+def test_malformed_cursors_are_rejected():
+    bad = [
+        "not base64!",
+        base64.urlsafe_b64encode(b"{not json").decode(),
+        base64.urlsafe_b64encode(b'["only-one-field"]').decode(),
+        base64.urlsafe_b64encode(b'["not a date", "booking-1"]').decode(),
+    ]
+
+    for cursor in bad:
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(server.get_bookings(make_request(), date=None, limit=2, cursor=cursor, format=None))
+        assert raised.value.status_code == 400, cursor
@@ -0,0 +1,115 @@
+import asyncio
+
+from caching import PaymentStatusCache, SingleFlight
+
+
+class FakeStripe:
+    """Stands in for the Stripe checkout client"""
+
+    def __init__(self, payment_status="unpaid", delay=0.01):
+        self.payment_status = payment_status
+        self.delay = delay
+        self.calls = 0
+
+    async def get_checkout_status(self, session_id):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {
+            "status": "complete" if self.payment_status == "paid" else "open",
+            "payment_status": self.payment_status,
+            "amount_total": 7500,
+            "currency": "usd",
+        }
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(stripe, stored=None, clock=None):
+    async def load_stored(session_id):
+        return (stored or {}).get(session_id)
+
+    return PaymentStatusCache(
+        stripe.get_checkout_status, load_stored, ttl_seconds=3, clock=clock or Clock()
+    )
+
+
+def test_concurrent_polls_share_one_upstream_call():
+    stripe = FakeStripe()
+    cache = make_cache(stripe)
+
+    async def poll():
+        return await asyncio.gather(*(cache.get("cs_1") for _ in range(20)))
+
+    results = asyncio.run(poll())
+    assert stripe.calls == 1
+    assert all(r["payment_status"] == "unpaid" for r in results)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["coalesced"] == 19
+
+
+def test_non_terminal_status_expires_after_ttl():
+    stripe = FakeStripe()
+    clock = Clock()
+    cache = make_cache(stripe, clock=clock)
+
+    async def scenario():
+        await cache.get("cs_1")
+        await cache.get("cs_1")
+        clock.now = 3.5
+        await cache.get("cs_1")
+
+    asyncio.run(scenario())
+    assert stripe.calls == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_terminal_status_is_kept():
+    stripe = FakeStripe(payment_status="paid")
+    clock = Clock()
+    cache = make_cache(stripe, clock=clock)
+
+    async def scenario():
+        await cache.get("cs_1")
+        clock.now = 10_000
+        return await cache.get("cs_1")
+
+    assert asyncio.run(scenario())["payment_status"] == "paid"
+    assert stripe.calls == 1
+
+
+def test_stored_paid_status_skips_stripe():
+    stripe = FakeStripe()
+    stored = {"cs_1": {"status": "complete", "payment_status": "paid",
+                       "amount_total": 7500, "currency": "usd"}}
+    cache = make_cache(stripe, stored=stored)
+
+    result = asyncio.run(cache.get("cs_1"))
+    assert result["payment_status"] == "paid"
+    assert stripe.calls == 0
+    assert cache.stats()["store_hits"] == 1
+
+
+def test_single_flight_forgets_failed_calls():
+    attempts = []
+
+    async def fetch(key):
+        attempts.append(key)
+        raise RuntimeError("stripe down")
+
+    async def scenario():
+        flight = SingleFlight()
+        for _ in range(2):
+            try:
+                await flight.do("k", lambda: fetch("k"))
+            except RuntimeError:
+                pass
+        return len(flight)
+
+    assert asyncio.run(scenario()) == 0
+    assert attempts == ["k", "k"]
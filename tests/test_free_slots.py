@@ -0,0 +1,40 @@
+import pytest
+
+from free_slots import free_windows
+
+
+def test_free_windows_around_buffered_booking():
+    # 09:00-11:00 booking blocks until 12:30 with the buffer
+    windows = free_windows(["2026-03-02"], ["v1"], [("2026-03-02", "v1", 540, 750)], 15)
+    assert windows == {"2026-03-02": [(0, 540), (750, 1440)]}
+
+
+def test_partially_blocked_bucket_is_taken():
+    windows = free_windows(["d"], ["v1"], [("d", "v1", 545, 715)], 30)
+    assert windows == {"d": [(0, 540), (720, 1440)]}
+
+
+def test_days_are_independent_and_clipped():
+    windows = free_windows(
+        ["d1", "d2", "d3"],
+        ["v1"],
+        [("d1", "v1", 1380, 1380 + 120), ("d3", "v1", 0, 1440), ("other", "v1", 0, 60)],
+        60,
+    )
+    assert windows == {"d1": [(0, 1380)], "d2": [(0, 1440)], "d3": []}
+
+
+def test_granularity_must_divide_the_day():
+    with pytest.raises(ValueError):
+        free_windows(["d"], ["v1"], [], 7)
+
+
+def test_windows_are_free_on_a_single_vehicle():
+    windows = free_windows(
+        ["d"],
+        ["v1", "v2"],
+        [("d", "v1", 600, 720), ("d", "v2", 0, 660), ("d", "v2", 900, 960)],
+        60,
+    )
+    # v2's 16:00-24:00 run lies inside v1's 12:00-24:00 run and is dropped
+    assert windows == {"d": [(0, 600), (660, 900), (720, 1440)]}
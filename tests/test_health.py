@@ -0,0 +1,54 @@
+import asyncio
+
+from health import CachedPing
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_checks_share_one_ping_until_the_ttl_runs_out():
+    clock = Clock()
+    calls = []
+
+    async def ping():
+        calls.append(clock.now)
+        await asyncio.sleep(0.01)
+
+    async def scenario():
+        health = CachedPing(ping, ttl_seconds=2, clock=clock)
+        first = await asyncio.gather(*(health.check() for _ in range(10)))
+        clock.now = 1.9
+        cached = await health.check()
+        clock.now = 2.1
+        await health.check()
+        return first, cached
+
+    first, cached = asyncio.run(scenario())
+
+    assert all(result["ok"] for result in first)
+    assert cached is first[0]
+    assert calls == [0.0, 2.1]
+
+
+def test_slow_or_failing_pings_report_not_ok():
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def down():
+        raise ConnectionError("no server")
+
+    async def scenario():
+        return (
+            await CachedPing(slow, timeout_seconds=0.01).check(),
+            await CachedPing(down).check(),
+        )
+
+    slow_result, down_result = asyncio.run(scenario())
+
+    assert slow_result["ok"] is False
+    assert down_result == {"ok": False, "error": "ConnectionError: no server"}
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from holds import HoldSweeper
+from rollups import DailyRollups
+from tests.memory_mongo import MemoryDatabase
+
+NOW = datetime(2030, 1, 1, 12, 0, tzinfo=timezone.utc)
+PROJECTION = {"date": 1, "duration_hours": 1, "total_price": 1, "start_minutes": 1, "blocked_until_minutes": 1}
+
+
+class Interleaved:
+    """Collection wrapper yielding to the event loop before every operation"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        cursor = self._collection.find(*args, **kwargs)
+        to_list = cursor.to_list
+
+        async def yielding_to_list(length):
+            await asyncio.sleep(0)
+            return await to_list(length)
+
+        cursor.to_list = yielding_to_list
+        return cursor
+
+    async def update_many(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return await self._collection.update_many(*args, **kwargs)
+
+
+def test_concurrent_sweepers_expire_each_booking_once():
+    bookings = [
+        {"id": f"booking-{n}", "date": "2030-01-15", "payment_status": "pending",
+         "hold_expires_at": NOW - timedelta(minutes=1), "duration_hours": 2, "total_price": 150.0,
+         "start_minutes": 540, "blocked_until_minutes": 750}
+        for n in range(5)
+    ]
+
+    async def scenario():
+        db = MemoryDatabase()
+        rollups = DailyRollups(db.daily_rollups)
+        await db.bookings.insert_many([dict(b) for b in bookings])
+        await rollups.move_many(bookings, None, "pending")
+
+        async def on_expired(expired):
+            await rollups.move_many(expired, "pending", "expired")
+
+        sweepers = [
+            HoldSweeper(Interleaved(db.bookings), on_expired, PROJECTION, batch_size=2, clock=lambda: NOW)
+            for _ in range(2)
+        ]
+        counts = await asyncio.gather(*(sweeper.sweep() for sweeper in sweepers))
+        return counts, await db.daily_rollups.find_one({"_id": "2030-01-15"})
+
+    counts, rollup = asyncio.run(scenario())
+
+    assert sum(counts) == 5
+    assert rollup["pending"]["bookings"] == 0
+    assert rollup["expired"]["bookings"] == 5
+    assert rollup["expired"]["total_price"] == 5 * 150.0
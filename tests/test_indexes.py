@@ -0,0 +1,21 @@
+"""Declared indexes against a local mongod, skipped when none answers"""
+import asyncio
+
+from indexes import HOT_QUERIES, INDEXES, ensure_indexes
+
+
+def test_every_hot_query_uses_its_declared_index(mongo_db):
+    async def scenario():
+        async with mongo_db.connect() as db:
+            return await ensure_indexes(db)
+
+    report = asyncio.run(scenario())
+
+    assert report["drift"] == []
+    assert len(report["created"]) == len(INDEXES)
+
+
+def test_hot_queries_name_declared_indexes():
+    declared = {(spec.collection, spec.name) for spec in INDEXES}
+
+    assert all((query.collection, query.index) in declared for query in HOT_QUERIES)
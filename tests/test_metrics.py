@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from metrics import MetricsMiddleware, MongoCommandTimer, Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, 'say "hi"')
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP op_seconds Op latency", "# TYPE op_seconds histogram"]
+    assert lines[2:] == [
+        'op_seconds_bucket{op="say \\"hi\\"",le="0.1"} 2',
+        'op_seconds_bucket{op="say \\"hi\\"",le="1.0"} 3',
+        'op_seconds_bucket{op="say \\"hi\\"",le="+Inf"} 4',
+        'op_seconds_sum{op="say \\"hi\\""} 3.65',
+        'op_seconds_count{op="say \\"hi\\""} 4',
+    ]
+
+
+def test_middleware_labels_requests_by_route_template():
+    registry = Registry()
+    latency = registry.histogram("http_seconds", "Latency", ("method", "route", "status"))
+    router = APIRouter(prefix="/api")
+
+    @router.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        if item_id == "missing":
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(MetricsMiddleware, histogram=latency)
+    client = TestClient(app)
+    for path in ("/api/items/1", "/api/items/2", "/api/items/missing", "/elsewhere"):
+        client.get(path)
+
+    counts = [line for line in registry.render().splitlines() if line.startswith("http_seconds_count")]
+    assert counts == [
+        'http_seconds_count{method="GET",route="/api/items/{item_id}",status="200"} 2',
+        'http_seconds_count{method="GET",route="/api/items/{item_id}",status="404"} 1',
+        'http_seconds_count{method="GET",route="unmatched",status="404"} 1',
+    ]
+
+
+def test_mongo_timer_only_records_selected_collections():
+    registry = Registry()
+    latency = registry.histogram("mongo_seconds", "Latency", ("collection", "command"), buckets=(1.0,))
+    failures = registry.counter("mongo_failures", "Failures", ("collection", "command"))
+    timer = MongoCommandTimer(latency, failures, ["bookings"])
+
+    def event(request_id, name, command, micros=2000):
+        return SimpleNamespace(
+            connection_id=("localhost", 27017), request_id=request_id,
+            command_name=name, command=command, duration_micros=micros,
+        )
+
+    timer.started(event(1, "find", {"find": "bookings"}))
+    timer.succeeded(event(1, "find", {}))
+    timer.started(event(2, "getMore", {"getMore": 42, "collection": "bookings"}))
+    timer.failed(event(2, "getMore", {}))
+    timer.started(event(3, "insert", {"insert": "vehicles"}))
+    timer.succeeded(event(3, "insert", {}))
+
+    text = registry.render()
+    assert 'mongo_seconds_count{collection="bookings",command="find"} 1' in text
+    assert 'mongo_seconds_sum{collection="bookings",command="find"} 0.002' in text
+    assert 'mongo_failures_total{collection="bookings",command="getMore"} 1' in text
+    assert "vehicles" not in text
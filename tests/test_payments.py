@@ -0,0 +1,146 @@
+"""Checkout sessions and payments, against the in-process stand-in"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from starlette.requests import Request
+
+import server
+from holds import utc_now
+from models import BookingCreate
+from tests.conftest import BOOKING_INPUT
+
+
+def checkout_request(booking_id):
+    return server.CheckoutRequest(booking_id=booking_id, origin_url="https://example.com")
+
+
+def http_request():
+    return Request({
+        "type": "http", "method": "POST", "path": "/api/payments/checkout", "query_string": b"",
+        "headers": [], "scheme": "https", "server": ("example.com", 443), "root_path": "",
+    })
+
+
+async def open_booking(db):
+    await server.create_booking(BookingCreate(**BOOKING_INPUT))
+    return (await db.bookings.find_one({}))["id"]
+
+
+async def book_and_let_expire(db, sweep=True):
+    """A booking with an open checkout session whose hold ran out, expired unless not ``sweep``"""
+    booking_id = await open_booking(db)
+    await db.payment_transactions.insert_one({
+        "session_id": "cs_1", "booking_id": booking_id, "amount": 75.0, "payment_status": "pending",
+    })
+    await db.bookings.update_one(
+        {"id": booking_id}, {"$set": {"session_id": "cs_1", "hold_expires_at": utc_now() - timedelta(minutes=1)}}
+    )
+    if sweep:
+        sweeper = server.HoldSweeper(db.bookings, server._expire_bookings, server._BOOKING_CHANGE_PROJECTION)
+        assert await sweeper.sweep() == 1
+
+
+async def settle(db):
+    paid = await server.transition_payment("cs_1", "paid")
+    schedule = await db.daily_schedules.find_one({"_id": BOOKING_INPUT["date"]})
+    rollup = await db.daily_rollups.find_one({"_id": BOOKING_INPUT["date"]})
+    return paid, schedule, rollup
+
+
+def test_late_payment_takes_its_slot_back_while_free(memory_db):
+    async def scenario():
+        await book_and_let_expire(memory_db)
+        return await settle(memory_db)
+
+    paid, schedule, rollup = asyncio.run(scenario())
+
+    assert paid["payment_status"] == "paid" and paid["vehicle_id"] == "default"
+    assert [(e["id"], e["payment_status"]) for e in schedule["entries"]] == [(paid["id"], "paid")]
+    assert rollup["paid"]["bookings"] == 1
+    assert rollup["expired"]["bookings"] == 0 and rollup["pending"]["bookings"] == 0
+
+
+def test_late_payment_for_a_taken_slot_is_left_unassigned(memory_db):
+    async def scenario():
+        await book_and_let_expire(memory_db)
+        await server.create_booking(BookingCreate(**BOOKING_INPUT))
+        return await settle(memory_db)
+
+    paid, schedule, rollup = asyncio.run(scenario())
+
+    assert paid["payment_status"] == server.PAID_UNASSIGNED
+    assert paid["id"] not in [e["id"] for e in schedule["entries"]]
+    assert len(schedule["entries"]) == 1
+    assert rollup["paid_unassigned"]["bookings"] == 1 and rollup["pending"]["bookings"] == 1
+
+
+def test_checkout_of_a_lapsed_hold_is_refused_before_the_sweep(memory_db, stripe_checkout):
+    async def scenario():
+        await book_and_let_expire(memory_db, sweep=False)
+        booking_id = (await memory_db.bookings.find_one({}))["id"]
+        await server.create_checkout_session(checkout_request(booking_id), http_request())
+
+    with pytest.raises(server.HTTPException) as raised:
+        asyncio.run(scenario())
+
+    assert raised.value.status_code == 409
+    assert stripe_checkout.requests == []
+
+
+
+def test_open_session_is_reused(memory_db, stripe_checkout):
+    async def scenario():
+        booking_id = await open_booking(memory_db)
+        first = await server.create_checkout_session(checkout_request(booking_id), http_request())
+        again = await server.create_checkout_session(checkout_request(booking_id), http_request())
+        return first, again
+
+    first, again = asyncio.run(scenario())
+
+    assert again == first
+    assert len(stripe_checkout.requests) == 1
+
+
+def test_concurrent_clicks_share_one_stripe_call(memory_db, stripe_checkout):
+    async def scenario():
+        booking_id = await open_booking(memory_db)
+        return await asyncio.gather(*(
+            server.create_checkout_session(checkout_request(booking_id), http_request()) for _ in range(5)
+        ))
+
+    results = asyncio.run(scenario())
+
+    assert len(stripe_checkout.requests) == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_amount_change_opens_a_new_session(memory_db, stripe_checkout):
+    async def scenario():
+        booking_id = await open_booking(memory_db)
+        first = await server.create_checkout_session(checkout_request(booking_id), http_request())
+        await memory_db.bookings.update_one({"id": booking_id}, {"$set": {"deposit_amount": 90.0}})
+        second = await server.create_checkout_session(checkout_request(booking_id), http_request())
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first["session_id"] != second["session_id"]
+    assert [request.amount for request in stripe_checkout.requests] == [75.0, 90.0]
+
+
+def test_session_is_not_reused_past_the_hold(memory_db, stripe_checkout):
+    async def scenario():
+        booking_id = await open_booking(memory_db)
+        await server.create_checkout_session(checkout_request(booking_id), http_request())
+        booking = await memory_db.bookings.find_one({"id": booking_id})
+        txn = await memory_db.payment_transactions.find_one({"session_id": booking["session_id"]})
+        live = await server._reusable_checkout(booking, 75.0)
+        lapsed = {**booking, "hold_expires_at": utc_now() - timedelta(seconds=1)}
+        return booking, txn, live, await server._reusable_checkout(lapsed, 75.0)
+
+    booking, txn, live, lapsed = asyncio.run(scenario())
+
+    assert txn["expires_at"] == booking["hold_expires_at"]
+    assert live["session_id"] == booking["session_id"]
+    assert lapsed is None
@@ -0,0 +1,49 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import ProfileStore, ProfilingMiddleware
+
+
+def make_client(tmp_path, **options):
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        return {"total": sum(range(1000))}
+
+    @app.get("/admin/profiles")
+    async def profiles():
+        return []
+
+    store = ProfileStore(tmp_path, max_profiles=3)
+    app.add_middleware(ProfilingMiddleware, store=store, skip_prefixes=("/admin",), **options)
+    return TestClient(app), store
+
+
+def test_token_header_profiles_one_request(tmp_path):
+    client, store = make_client(tmp_path, token="secret")
+
+    profiled = client.get("/work", headers={"X-Profile-Token": "secret"})
+    wrong = client.get("/work", headers={"X-Profile-Token": "guess"})
+    plain = client.get("/work")
+
+    name = profiled.headers["x-profile-id"]
+    assert "x-profile-id" not in wrong.headers and "x-profile-id" not in plain.headers
+    assert [c["name"] for c in store.list()] == [name]
+    assert store.list()[0]["trigger"] == "token"
+    assert store.path(name).stat().st_size > 0
+    assert store.path("../" + name) is None
+
+
+def test_sampled_captures_stay_within_the_ring(tmp_path):
+    client, store = make_client(tmp_path, sample_rate=0.5, rand=lambda: 0.1)
+
+    for _ in range(5):
+        client.get("/work")
+    client.get("/admin/profiles")
+
+    captures = store.list()
+    assert len(captures) == 3
+    assert {c["trigger"] for c in captures} == {"sample"}
+    assert {c["path"] for c in captures} == {"/work"}
+    assert len(list(tmp_path.glob("*.json"))) == 3
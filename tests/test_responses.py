@@ -0,0 +1,54 @@
+import json
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pydantic import BaseModel
+from bson.tz_util import utc
+
+from responses import adapter, model_response, not_modified, strong_etag, trusted_response
+
+
+class Row(BaseModel):
+    id: str
+    note: Optional[str] = None
+    created_at: datetime
+
+
+def test_trusted_rows_render_like_pydantic():
+    rows = [
+        {"id": "a", "note": None, "created_at": datetime(2030, 1, 1, 9, 30, 0, 123000, tzinfo=utc)},
+        {"id": "b", "note": "hi", "created_at": datetime(2030, 1, 2, tzinfo=timezone.utc)},
+    ]
+
+    body = trusted_response(rows, headers={"X-Next-Cursor": "c"})
+
+    rows_adapter = adapter(List[Row])
+    assert json.loads(body.body) == json.loads(rows_adapter.dump_json(rows_adapter.validate_python(rows)))
+    assert body.headers["X-Next-Cursor"] == "c"
+
+
+def test_model_response_keeps_status_and_is_cached():
+    row = Row(id="a", created_at=datetime(2030, 1, 1, tzinfo=timezone.utc))
+
+    response = model_response(Row, row, status_code=201)
+
+    assert response.status_code == 201
+    assert json.loads(response.body) == {"id": "a", "note": None, "created_at": "2030-01-01T00:00:00Z"}
+    assert adapter(Row) is adapter(Row)
+
+
+def test_matching_if_none_match_gets_a_304():
+    from starlette.requests import Request
+
+    def request(if_none_match=None):
+        headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+        return Request({"type": "http", "headers": headers})
+
+    etag = strong_etag("bookings", "2030-01-15", 7)
+
+    assert etag == strong_etag("bookings", "2030-01-15", 7) != strong_etag("bookings", "2030-01-15", 8)
+    assert not_modified(request(), etag) is None
+    assert not_modified(request('"other"'), etag) is None
+    for header in (etag, f'"other", W/{etag}', "*"):
+        response = not_modified(request(header), etag)
+        assert response.status_code == 304 and response.headers["etag"] == etag
@@ -0,0 +1,108 @@
+import asyncio
+import uuid
+
+import pytest
+
+from availability import booking_minutes
+from rollups import BookingMinutesMissing, DailyRollups, rebuild_rollups, summarize, summarize_range
+from tests.memory_mongo import MemoryDatabase
+
+DATE = "2030-01-15"
+
+
+def booking(status, start_time="09:00 AM", end_time="11:00 AM", price=150.0, date=DATE):
+    return {
+        "id": str(uuid.uuid4()),
+        "date": date,
+        "payment_status": status,
+        "duration_hours": 2.0,
+        "total_price": price,
+        "deposit_amount": price / 2,
+        **booking_minutes(start_time, end_time),
+    }
+
+
+def test_status_changes_move_amounts_between_statuses():
+    async def scenario():
+        db = MemoryDatabase()
+        rollups = DailyRollups(db.daily_rollups)
+        paid, expired, cancelled = booking("pending"), booking("pending"), booking("pending", price=300.0)
+        for b in (paid, expired, cancelled):
+            await rollups.move(b, None, "pending")
+        await rollups.move(paid, "pending", "paid")
+        await rollups.move_many([expired], "pending", "expired")
+        await rollups.move(cancelled, "pending", "cancelled")
+        await rollups.move(paid, "paid", "paid")
+        return await rollups.range(DATE, DATE)
+
+    (rollup,) = asyncio.run(scenario())
+
+    assert rollup["pending"] == {
+        "bookings": 0, "booked_hours": 0, "blocked_minutes": 0, "total_price": 0, "deposit_amount": 0
+    }
+    assert rollup["paid"] == {
+        "bookings": 1, "booked_hours": 2.0, "blocked_minutes": 210, "total_price": 150.0, "deposit_amount": 75.0
+    }
+    assert rollup["expired"]["bookings"] == 1
+    assert rollup["cancelled"]["total_price"] == 300.0
+
+
+def test_summaries_count_blocking_bookings_with_their_buffer():
+    rollup = {
+        "paid": {"bookings": 2, "booked_hours": 4, "blocked_minutes": 420, "total_price": 300, "deposit_amount": 150},
+        "pending": {"bookings": 1, "booked_hours": 2, "blocked_minutes": 210, "total_price": 150, "deposit_amount": 75},
+        "expired": {"bookings": 3},
+        "paid_unassigned": {"bookings": 1, "total_price": 150, "deposit_amount": 75},
+    }
+
+    day = summarize(DATE, rollup, vehicle_count=2)
+    empty = summarize("2030-01-16", None, vehicle_count=2)
+    totals = summarize_range([day, empty], vehicle_count=2)
+
+    assert day["revenue"] == 300
+    assert day["deposits_collected"] == 150
+    assert day["deposits_pending"] == 75
+    assert day["outstanding_balance"] == 150
+    assert day["utilization"] == 630 / (2 * 1440)
+    assert day["expired"] == 3
+    assert day["paid_unassigned"] == 1 and totals["paid_unassigned"] == 1
+    assert empty["bookings"] == 0 and empty["utilization"] == 0
+    assert totals["bookings"] == 3
+    assert totals["utilization"] == 630 / (2 * 2 * 1440)
+
+
+def test_rebuild_refuses_bookings_without_minute_fields():
+    legacy = {k: v for k, v in booking("paid").items() if not k.endswith("_minutes")}
+
+    async def scenario():
+        db = MemoryDatabase()
+        await db.bookings.insert_many([booking("paid"), legacy])
+        await rebuild_rollups(db, DATE, DATE)
+
+    with pytest.raises(BookingMinutesMissing, match="booking-minutes"):
+        asyncio.run(scenario())
+
+
+def test_rebuild_matches_incremental_rollups(mongo_db):
+    bookings = [
+        booking("paid"), booking("pending", "01:00 PM", "03:00 PM"),
+        booking("expired", price=200.0), booking("paid", date="2030-01-16"),
+    ]
+
+    async def scenario():
+        async with mongo_db.connect() as db:
+            rollups = DailyRollups(db.daily_rollups)
+            for b in bookings:
+                await db.bookings.insert_one(dict(b))
+                await rollups.move(b, None, b["payment_status"])
+            await db.daily_rollups.insert_one({"_id": "2030-01-17", "paid": {"bookings": 1}})
+            incremental = [summarize(r["_id"], r, 1) for r in await rollups.range(DATE, "2030-01-16")]
+            stats = await rebuild_rollups(db)
+            rebuilt = [summarize(r["_id"], r, 1) for r in await rollups.range(DATE, "2030-01-17")]
+            return incremental, rebuilt, stats
+
+    incremental, rebuilt, stats = asyncio.run(scenario())
+
+    assert rebuilt == incremental
+    assert stats["dates"] == 2
+    assert stats["deleted"] == 1
@@ -0,0 +1,160 @@
+"""Slot reservations, with a concurrency stress test against a local mongod.
+
+Uses the ``mongo_db`` fixture: a throwaway database on ``TEST_MONGO_URL``
+(default ``mongodb://localhost:27017``), skipped when no server answers.
+The interval cache tests run on the in-process stand-in.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from availability import booking_minutes, minutes_to_time
+from schedules import DailySchedules, SlotTaken, rebuild_schedules, schedule_entry
+from tests.memory_mongo import MemoryDatabase
+
+NOW = datetime.now(timezone.utc)
+DATE = "2030-01-15"
+
+
+def booking(start, end):
+    return {
+        "id": str(uuid.uuid4()),
+        "date": DATE,
+        "payment_status": "pending",
+        "hold_expires_at": NOW + timedelta(minutes=30),
+        **booking_minutes(minutes_to_time(start), minutes_to_time(end)),
+    }
+
+
+async def run_reservations(mongo_db, bookings, vehicles):
+    async def no_bookings(date):
+        return []
+
+    async with mongo_db.connect() as db:
+        schedules = DailySchedules(db.daily_schedules, no_bookings, max_attempts=200)
+
+        async def reserve(b):
+            try:
+                return await schedules.reserve(b, vehicles, NOW)
+            except SlotTaken:
+                return None
+
+        results = await asyncio.gather(*(reserve(b) for b in bookings))
+        stored = await db.daily_schedules.find_one({"_id": DATE})
+        return results, stored
+
+
+def test_only_one_of_many_overlapping_reservations_wins(mongo_db):
+    bookings = [booking(9 * 60, 11 * 60) for _ in range(50)]
+
+    results, stored = asyncio.run(run_reservations(mongo_db, bookings, ["v1"]))
+
+    assert results.count("v1") == 1
+    assert results.count(None) == 49
+    assert len(stored["entries"]) == 1
+
+
+def test_overlapping_reservations_fill_every_vehicle_once(mongo_db):
+    vehicles = [f"v{i}" for i in range(5)]
+    bookings = [booking(14 * 60, 16 * 60) for _ in range(40)]
+
+    results, stored = asyncio.run(run_reservations(mongo_db, bookings, vehicles))
+
+    assert sorted(r for r in results if r) == vehicles
+    assert len(stored["entries"]) == 5
+
+
+def test_non_overlapping_reservations_on_one_date_all_succeed(mongo_db):
+    # Two-hour slots that leave room for the 90 minute buffer
+    bookings = [booking(start, start + 60) for start in range(0, 22 * 60, 150)]
+
+    results, stored = asyncio.run(run_reservations(mongo_db, bookings, ["v1"]))
+
+    assert results == ["v1"] * len(bookings)
+    assert len(stored["entries"]) == len(bookings)
+
+
+async def run_rebuild(mongo_db, bookings, stored_schedules):
+    async with mongo_db.connect() as db:
+        await db.bookings.insert_many(bookings)
+        await db.daily_schedules.insert_many(stored_schedules)
+        verified = await rebuild_schedules(db, NOW, verify_only=True)
+        rebuilt = await rebuild_schedules(db, NOW)
+        again = await rebuild_schedules(db, NOW, verify_only=True)
+        stored = {s["_id"]: s async for s in db.daily_schedules.find()}
+        return verified, rebuilt, again, stored
+
+
+def test_rebuild_repairs_drifted_schedules(mongo_db):
+    paid = {**booking(9 * 60, 11 * 60), "payment_status": "paid", "hold_expires_at": None}
+    expired_hold = {**booking(13 * 60, 14 * 60), "hold_expires_at": NOW - timedelta(minutes=1)}
+    gone = {**booking(9 * 60, 10 * 60), "date": "2030-01-16", "vehicle_id": "default"}
+    stale = {"_id": "2030-01-16", "version": 3, "entries": [schedule_entry(gone)]}
+
+    verified, rebuilt, again, stored = asyncio.run(
+        run_rebuild(mongo_db, [paid, expired_hold], [stale])
+    )
+
+    assert verified["mismatched"] == 2 and verified["written"] == 0
+    assert rebuilt["bookings"] == 1 and rebuilt["written"] == 2
+    assert again["mismatched"] == 0
+    assert [e["id"] for e in stored[DATE]["entries"]] == [paid["id"]]
+    assert stored["2030-01-16"]["entries"] == [] and stored["2030-01-16"]["version"] == 4
+
+
+def test_rebuild_of_a_date_range_leaves_other_dates_alone(mongo_db):
+    paid = {**booking(9 * 60, 11 * 60), "payment_status": "paid", "hold_expires_at": None}
+    outside = {**paid, "id": str(uuid.uuid4()), "date": "2030-01-20"}
+
+    async def scenario():
+        async with mongo_db.connect() as db:
+            await db.bookings.insert_many([paid, outside])
+            stats = await rebuild_schedules(db, NOW, from_date=DATE, to_date=DATE)
+            return stats, [s["_id"] async for s in db.daily_schedules.find()]
+
+    stats, dates = asyncio.run(scenario())
+
+    assert stats["bookings"] == 1 and stats["written"] == 1
+    assert dates == [DATE]
+
+
+def test_intervals_are_rebuilt_only_when_the_version_moves():
+    async def no_bookings(date):
+        return []
+
+    async def scenario():
+        schedules = DailySchedules(MemoryDatabase().daily_schedules, no_bookings)
+        first = booking(9 * 60, 10 * 60)
+        await schedules.reserve(first, ["v1"], NOW)
+        schedule = await schedules.get(DATE)
+        cached = schedules.fleet_day(schedule)
+        same = schedules.fleet_day(await schedules.get(DATE))
+        await schedules.reserve(booking(14 * 60, 15 * 60), ["v1"], NOW)
+        moved = schedules.fleet_day(await schedules.get(DATE))
+        return cached, same, moved
+
+    cached, same, moved = asyncio.run(scenario())
+
+    assert same is cached and len(cached) == 1
+    assert moved is not cached and len(moved) == 2
+
+
+def test_cached_intervals_skip_holds_that_ran_out():
+    async def no_bookings(date):
+        return []
+
+    async def scenario():
+        schedules = DailySchedules(MemoryDatabase().daily_schedules, no_bookings)
+        held = booking(9 * 60, 11 * 60)
+        await schedules.reserve(held, ["v1"], NOW)
+        day = schedules.fleet_day(await schedules.get(DATE))
+        blocked = day.find_conflict(10 * 60, 11 * 60, ["v1"], now=NOW)
+        # Same version, but the hold is over
+        later = held["hold_expires_at"] + timedelta(seconds=1)
+        freed = day.find_conflict(10 * 60, 11 * 60, ["v1"], now=later)
+        return blocked, freed, await schedules.reserve(booking(10 * 60, 11 * 60), ["v1"], later)
+
+    blocked, freed, vehicle_id = asyncio.run(scenario())
+
+    assert blocked is not None and freed is None
+    assert vehicle_id == "v1"
@@ -0,0 +1,118 @@
+import asyncio
+import gzip
+import io
+from datetime import datetime, timedelta, timezone
+
+from tests.memory_mongo import MemoryDatabase
+from indexes import INDEXES
+from transfer import MODELS, Checkpoint, export_collection, import_rows, read_rows, to_document
+
+NOW = datetime(2030, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def booking(n, **fields):
+    return {
+        "id": f"booking-{n}",
+        "date": "2030-01-15",
+        "start_time": "09:00 AM",
+        "end_time": "11:00 AM",
+        "pickup_location": "1 Main St",
+        "dropoff_location": "2 Side St",
+        "full_name": "Sam Rider",
+        "email": "sam@example.com",
+        "phone": "555-0100",
+        "duration_hours": 2.0,
+        "total_price": 150.0,
+        "deposit_amount": 75.0,
+        "special_requests": None,
+        "payment_status": "pending",
+        "session_id": None,
+        "vehicle_id": "default",
+        "created_at": NOW + timedelta(seconds=n),
+        "start_minutes": 540,
+        "end_minutes": 660,
+        "blocked_until_minutes": 750,
+        "hold_expires_at": NOW + timedelta(minutes=30),
+        **fields,
+    }
+
+
+def round_trip(collection, docs, fmt, tmp_path, batch_size=2):
+    async def scenario():
+        source, target = MemoryDatabase(), MemoryDatabase()
+        await source[collection].insert_many(docs)
+        raw = io.BytesIO()
+        with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            exported = await export_collection(source, collection, out, fmt)
+        raw.seek(0)
+        with gzip.GzipFile(fileobj=raw, mode="rb") as source_file:
+            state = await import_rows(
+                target, collection, read_rows(source_file, fmt),
+                Checkpoint(tmp_path / "import.checkpoint"), batch_size=batch_size, concurrency=2,
+            )
+        imported = await target[collection].find({}, {"_id": 0}).sort("id").to_list(None)
+        return exported, state, imported
+
+    return asyncio.run(scenario())
+
+
+def test_ndjson_round_trip_keeps_types_and_internal_fields(tmp_path):
+    docs = [booking(n) for n in range(5)] + [booking(5, email=None)]
+
+    exported, state, imported = round_trip("bookings", [dict(d) for d in docs], "ndjson", tmp_path)
+
+    assert exported == 6
+    assert state == {"rows": 6, "inserted": 5, "duplicates": 0, "invalid": 1}
+    assert imported == docs[:5]
+
+
+def test_bookings_without_minute_fields_get_them_computed():
+    old = booking(1)
+    for field in ("start_minutes", "end_minutes", "blocked_until_minutes"):
+        del old[field]
+
+    doc = to_document("bookings", old)
+
+    assert (doc["start_minutes"], doc["end_minutes"], doc["blocked_until_minutes"]) == (540, 660, 750)
+
+
+def test_every_imported_collection_has_a_unique_id():
+    unique_ids = {spec.collection for spec in INDEXES if spec.keys == [("id", 1)] and spec.options.get("unique")}
+
+    assert set(MODELS) <= unique_ids
+
+
+def test_csv_round_trip_keeps_internal_fields(tmp_path):
+    payment = {
+        "id": "txn-1", "session_id": "cs_1", "booking_id": "booking-1", "amount": 75.0,
+        "currency": "usd", "payment_status": "paid", "metadata": {"booking_id": "booking-1"},
+        "created_at": NOW, "updated_at": NOW, "url": "https://checkout.stripe.com/c/cs_1",
+        "expires_at": NOW + timedelta(minutes=30),
+        "checkout_status": {"status": "complete", "payment_status": "paid", "amount_total": 7500},
+    }
+
+    _, state, imported = round_trip("payment_transactions", [dict(payment)], "csv", tmp_path)
+
+    assert state["inserted"] == 1
+    assert imported == [payment]
+
+
+def test_import_resumes_after_the_checkpointed_rows(tmp_path):
+    checkpoint = Checkpoint(tmp_path / "import.checkpoint")
+    # Out of order: the checkpoint waits for rows 1-2 before moving past 3-4
+    checkpoint.finish(2, 4, {"inserted": 2, "duplicates": 0, "invalid": 0})
+    assert not checkpoint.path.exists()
+    checkpoint.finish(0, 2, {"inserted": 2, "duplicates": 0, "invalid": 0})
+    assert Checkpoint(checkpoint.path).load() == 4
+
+    async def scenario():
+        db = MemoryDatabase()
+        rows = [booking(n) for n in range(6)]
+        state = await import_rows(db, "bookings", iter(rows), Checkpoint(checkpoint.path), batch_size=10)
+        ids = [doc["id"] for doc in await db.bookings.find({}).to_list(None)]
+        return state, ids
+
+    state, ids = asyncio.run(scenario())
+
+    assert sorted(ids) == ["booking-4", "booking-5"]
+    assert state == {"rows": 6, "inserted": 6, "duplicates": 0, "invalid": 0}
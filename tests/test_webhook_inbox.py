@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from tests.memory_mongo import MemoryDatabase
+from webhook_inbox import WebhookInbox
+
+START = datetime(2030, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class Clock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+def make_inbox(handler=None, **options):
+    calls = []
+
+    async def record(event):
+        # Yield, the way a real handler's database writes do
+        await asyncio.sleep(0)
+        calls.append(event["_id"])
+
+    db = MemoryDatabase()
+    clock = Clock()
+    inbox = WebhookInbox(db.webhook_events, handler or record, clock=clock, **options)
+    return inbox, db.webhook_events, clock, calls
+
+
+def test_repeated_event_ids_are_dropped():
+    async def scenario():
+        inbox, events, _, _ = make_inbox()
+        first = await inbox.submit("evt_1", {"session_id": "cs_1"})
+        again = await inbox.submit("evt_1", {"session_id": "cs_1"})
+        return first, again, inbox, await events.count_documents({})
+
+    first, again, inbox, stored = asyncio.run(scenario())
+
+    assert (first, again) == (True, False)
+    assert (inbox.received, inbox.duplicates, stored) == (1, 1, 1)
+
+
+def test_an_event_queued_twice_is_handled_by_one_worker():
+    async def scenario():
+        inbox, events, _, calls = make_inbox(workers=4)
+        await inbox.submit("evt_1", {})
+        # Still pending, so the sweep queues it a second time
+        assert await inbox.sweep() == 1
+        await inbox.start()
+        await inbox._queue.join()
+        await inbox.stop()
+        return calls, await events.find_one({"_id": "evt_1"})
+
+    calls, event = asyncio.run(scenario())
+
+    assert calls == ["evt_1"]
+    assert event["status"] == "done" and event["attempts"] == 1
+
+
+def test_failing_events_are_retried_until_max_attempts():
+    attempts = []
+
+    async def failing(event):
+        attempts.append(event["attempts"])
+        raise RuntimeError("booking store down")
+
+    async def scenario():
+        inbox, events, _, _ = make_inbox(failing, max_attempts=3)
+        await inbox.submit("evt_1", {})
+        for _ in range(4):
+            await inbox._process("evt_1")
+        return inbox, await events.find_one({"_id": "evt_1"})
+
+    inbox, event = asyncio.run(scenario())
+
+    assert attempts == [1, 2, 3]
+    assert event["status"] == "failed" and event["error"] == "booking store down"
+    assert inbox.failed == 1 and inbox.processed == 0
+
+
+def test_sweep_requeues_claims_of_dead_workers_only():
+    async def scenario():
+        inbox, events, clock, _ = make_inbox(stale_after_seconds=300)
+        await events.insert_many([
+            {"_id": "stale", "status": "processing", "claimed_at": START - timedelta(seconds=301),
+             "received_at": START - timedelta(seconds=400), "attempts": 1},
+            {"_id": "busy", "status": "processing", "claimed_at": START - timedelta(seconds=10),
+             "received_at": START - timedelta(seconds=20), "attempts": 1},
+            {"_id": "done", "status": "done", "received_at": START - timedelta(seconds=500), "attempts": 1},
+        ])
+        queued = await inbox.sweep()
+        statuses = {e["_id"]: e["status"] async for e in events.find({})}
+        return queued, statuses, inbox._queue.get_nowait()
+
+    queued, statuses, next_event = asyncio.run(scenario())
+
+    assert queued == 1 and next_event == "stale"
+    assert statuses == {"stale": "pending", "busy": "processing", "done": "done"}
+
+
+def test_stats_report_processing_and_pending_lag():
+    async def scenario():
+        inbox, _, clock, _ = make_inbox()
+        await inbox.submit("evt_1", {})
+        clock.advance(5)
+        await inbox._process("evt_1")
+        await inbox.submit("evt_2", {})
+        clock.advance(7)
+        return await inbox.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["last_lag_seconds"] == 5
+    assert stats["oldest_pending_lag_seconds"] == 7
+    assert stats["backlog"] == 1 and stats["queue_depth"] == 2
+    assert (stats["received"], stats["processed"], stats["duplicates"], stats["failed"]) == (2, 1, 0, 0)
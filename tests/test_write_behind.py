@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from write_behind import BufferFull, BufferedWriter
+
+
+class FakeCollection:
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self.delay = delay
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(self.delay)
+        self.batches.append(list(docs))
+
+
+def test_full_batches_flush_without_waiting_for_the_interval():
+    async def scenario():
+        collection = FakeCollection()
+        writer = BufferedWriter(collection, max_batch=10, flush_interval_seconds=60)
+        writer.start()
+        for i in range(25):
+            await writer.submit({"n": i})
+        await asyncio.sleep(0.01)
+        sizes = [len(b) for b in collection.batches]
+        await writer.stop()
+        return sizes, collection, writer
+
+    sizes, collection, writer = asyncio.run(scenario())
+
+    assert sizes == [10, 10]
+    # stop() drains the partial batch
+    assert [len(b) for b in collection.batches] == [10, 10, 5]
+    assert [d["n"] for b in collection.batches for d in b] == list(range(25))
+    assert writer.stats()["written"] == 25
+
+
+def test_partial_batch_flushes_after_the_interval():
+    async def scenario():
+        collection = FakeCollection()
+        writer = BufferedWriter(collection, max_batch=100, flush_interval_seconds=0.02)
+        writer.start()
+        await writer.submit({"n": 1})
+        await writer.submit({"n": 2})
+        await asyncio.sleep(0.1)
+        flushed = list(collection.batches)
+        await writer.stop()
+        return flushed
+
+    assert [len(b) for b in asyncio.run(scenario())] == [2]
+
+
+def test_full_queue_pushes_back_on_submitters():
+    async def scenario():
+        writer = BufferedWriter(FakeCollection(), queue_size=2, put_timeout_seconds=0.01)
+        # Not started, so nothing drains the queue
+        await writer.submit({"n": 1})
+        await writer.submit({"n": 2})
+        with pytest.raises(BufferFull):
+            await writer.submit({"n": 3})
+        return writer.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["queue_depth"] == 2
+    assert stats["rejected"] == 1